@@ -2,6 +2,8 @@
 Configuration module for the FastAPI backend.
 Loads environment variables from .env file.
 """
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,9 +12,50 @@ class Settings(BaseSettings):
     
     google_api_key: str
     gemini_model: str = "gemini-2.5-flash-lite"
+    # Model tiers: curriculum and lesson notes use the pro model, the short
+    # pretest and recommendation calls the flash model. The pro model falls
+    # back to gemini_model when unset.
+    gemini_model_pro: Optional[str] = None
+    gemini_model_flash: str = "gemini-2.5-flash-lite"
     debug: bool = True
     host: str = "0.0.0.0"
     port: int = 8000
+    # Refresher and dynamic quiz attempts are buffered per process and appended
+    # in batches; a batch is written once it reaches this many attempts or
+    # after this many milliseconds. Main-quiz attempts are written immediately.
+    attempt_batch_size: int = 50
+    attempt_flush_interval_ms: int = 100
+    # Indent stored JSON files for readability (compact by default)
+    pretty_json: bool = False
+    # Identical Gemini prompts (curriculum, lesson notes, pretest, recommendation)
+    # reuse a cached response for this long; 0 disables the cache.
+    response_cache_size: int = 1000
+    response_cache_ttl_seconds: int = 3600
+    # SQLite file (relative to backend/) that also keeps cached responses across restarts and
+    # shares them between worker processes; empty keeps them in memory only.
+    response_cache_path: str = ".cache/gemini/responses.sqlite3"
+    # Maximum Gemini calls one request may have in flight when it fans out
+    gemini_max_concurrency: int = 4
+    # Refresher quizzes generated ahead of time per course week (0 = generate
+    # each one on request); each worker process keeps its own pool in memory
+    refresher_pool_size: int = 2
+    # Gemini quota per minute, shared by every call in the process (0 = unlimited)
+    gemini_requests_per_minute: int = 60
+    gemini_tokens_per_minute: int = 250000
+    # Keep retrying Gemini calls that fail with 429/500/503 for up to this
+    # many seconds, with jittered exponential backoff (0 = SDK default)
+    gemini_retry_timeout_seconds: float = 60
+    # Gemini calls in flight across the process (0 = unlimited) and callers
+    # allowed to queue for one before requests are rejected with 503
+    gemini_max_in_flight: int = 8
+    gemini_max_queued: int = 256
+    # Reuse responses for paraphrased inputs (outlines, topic descriptions)
+    # whose embeddings are at least this similar. Cached calls switch to
+    # temperature 0 while this is on. Entries share the response cache's
+    # size, TTL and SQLite file.
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.97
+    embedding_model: str = "models/text-embedding-004"
     
     class Config:
         env_file = ".env"
@@ -1,10 +1,12 @@
 """
 FastAPI application for Teacher Dashboard Backend.
 """
-from typing import List
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
+import orjson
 from fastapi import FastAPI, HTTPException, Request, Query, File, Form
 from fastapi.datastructures import UploadFile
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from models import (
     CurriculumGenerationRequest,
@@ -37,6 +39,8 @@ from services.auth_service import AuthService
 from services.student_service import StudentService
 from services.pretest_service import PretestService
 from services.quiz_service import QuizService
+from utils.gemini_client import get_gemini_client
+from utils.priority_gate import GeminiBusyError
 from config import settings
 
 import uvicorn
@@ -61,6 +65,18 @@ def _coerce_bool(value: bool | str | None, default: bool) -> bool:
     return value.lower() in {"true", "1", "yes", "on"}
 
 
+@app.exception_handler(GeminiBusyError)
+async def gemini_busy_handler(request: Request, exc: GeminiBusyError) -> JSONResponse:
+    """Reject requests the Gemini queue has no room for, so clients back off and retry."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.on_event("shutdown")
+async def close_gemini_client():
+    """Close the Gemini connections when the server stops."""
+    await get_gemini_client().aclose()
+
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -90,6 +106,88 @@ def health_check():
     )
 
 
+async def _read_curriculum_request(request: Request) -> CurriculumGenerationRequest:
+    """
+    Build a CurriculumGenerationRequest from a JSON or multipart/form-data body.
+    
+    Raises:
+        HTTPException: 400 if required fields or content sources are missing
+    """
+    payload: CurriculumGenerationRequest | None = None
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+
+        course_id = form.get("course_id")
+        number_of_weeks = form.get("number_of_weeks")
+
+        if course_id is None or number_of_weeks is None:
+            raise HTTPException(
+                status_code=400,
+                detail="course_id and number_of_weeks are required"
+            )
+
+        syllabus_content = None
+        upload: UploadFile | None = form.get("syllabus_file")  # type: ignore[assignment]
+        if isinstance(upload, UploadFile):
+            file_bytes = await upload.read()
+            syllabus_content = file_bytes.decode("utf-8", errors="ignore")
+
+        payload = CurriculumGenerationRequest(
+            course_id=course_id,
+            syllabus_content=syllabus_content,
+            course_outline=form.get("course_outline"),
+            number_of_weeks=int(number_of_weeks),
+            include_study_materials=_coerce_bool(form.get("include_study_materials"), default=True),
+            include_media_links=_coerce_bool(form.get("include_media_links"), default=True),
+            ai_engine=form.get("ai_engine") or "gemini"
+        )
+    else:
+        data = await request.json()
+        payload = CurriculumGenerationRequest(**data)
+
+    # Validate that at least one content source is provided
+    if not payload.syllabus_content and not payload.course_outline:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one of syllabus_content or course_outline is required"
+        )
+
+    return payload
+
+
+async def _start_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Run a text stream up to its first chunk before the response begins.
+    
+    The Gemini slot is taken and the request sent while the route can
+    still answer with an error status (503 for GeminiBusyError, or the
+    route's own mapping). Failures after the first chunk can no longer
+    change the status, so they end the stream with an {"error": ...} line.
+    
+    Returns:
+        An iterator yielding the whole stream, first chunk included
+    """
+    try:
+        first: Optional[str] = await anext(chunks)
+    except StopAsyncIteration:
+        first = None
+    return _resume_stream(first, chunks)
+
+
+async def _resume_stream(first: Optional[str], chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Yield a stream started by _start_stream, ending it with an error line on failure."""
+    async with aclosing(chunks):
+        try:
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            yield "\n" + orjson.dumps({"error": str(e)}).decode() + "\n"
+
+
 @app.post("/api/curriculum/generate", response_model=CurriculumGenerationResponse, tags=["Curriculum"])
 async def generate_curriculum(request: Request) -> CurriculumGenerationResponse:
     """
@@ -102,49 +200,10 @@ async def generate_curriculum(request: Request) -> CurriculumGenerationResponse:
         CurriculumGenerationResponse with generated curriculum
     """
     try:
-        payload: CurriculumGenerationRequest | None = None
-        content_type = request.headers.get("content-type", "")
-
-        if content_type.startswith("multipart/form-data"):
-            form = await request.form()
-
-            course_id = form.get("course_id")
-            number_of_weeks = form.get("number_of_weeks")
-
-            if course_id is None or number_of_weeks is None:
-                raise HTTPException(
-                    status_code=400,
-                    detail="course_id and number_of_weeks are required"
-                )
-
-            syllabus_content = None
-            upload: UploadFile | None = form.get("syllabus_file")  # type: ignore[assignment]
-            if isinstance(upload, UploadFile):
-                file_bytes = await upload.read()
-                syllabus_content = file_bytes.decode("utf-8", errors="ignore")
-
-            payload = CurriculumGenerationRequest(
-                course_id=course_id,
-                syllabus_content=syllabus_content,
-                course_outline=form.get("course_outline"),
-                number_of_weeks=int(number_of_weeks),
-                include_study_materials=_coerce_bool(form.get("include_study_materials"), default=True),
-                include_media_links=_coerce_bool(form.get("include_media_links"), default=True),
-                ai_engine=form.get("ai_engine") or "gemini"
-            )
-        else:
-            data = await request.json()
-            payload = CurriculumGenerationRequest(**data)
-
-        # Validate that at least one content source is provided
-        if not payload.syllabus_content and not payload.course_outline:
-            raise HTTPException(
-                status_code=400,
-                detail="At least one of syllabus_content or course_outline is required"
-            )
+        payload = await _read_curriculum_request(request)
         
         # Generate curriculum using service
-        response = curriculum_service.generate_curriculum(
+        response = await curriculum_service.generate_curriculum_async(
             course_id=payload.course_id,
             syllabus_content=payload.syllabus_content or "",
             course_outline=payload.course_outline or "",
@@ -162,7 +221,7 @@ async def generate_curriculum(request: Request) -> CurriculumGenerationResponse:
         
         return response
     
-    except HTTPException:
+    except (HTTPException, GeminiBusyError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -171,6 +230,41 @@ async def generate_curriculum(request: Request) -> CurriculumGenerationResponse:
         )
 
 
+@app.post("/api/curriculum/generate/stream", tags=["Curriculum"])
+async def stream_curriculum(request: Request) -> StreamingResponse:
+    """
+    Generate a curriculum, streaming Gemini's raw JSON text as it is produced.
+    
+    Accepts the same JSON or multipart/form-data body as /api/curriculum/generate.
+    The curriculum is parsed and saved once the stream ends; fetch it with
+    GET /api/curriculum/{course_id}. Errors before any text is produced get
+    an error status; later ones end the stream with an {"error": ...} line.
+    """
+    payload = await _read_curriculum_request(request)
+    try:
+        chunks = await _start_stream(curriculum_service.stream_curriculum(
+            course_id=payload.course_id,
+            syllabus_content=payload.syllabus_content or "",
+            course_outline=payload.course_outline or "",
+            number_of_weeks=payload.number_of_weeks,
+            include_study_materials=payload.include_study_materials,
+            include_media_links=payload.include_media_links
+        ))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except GeminiBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating curriculum: {str(e)}"
+        )
+    return StreamingResponse(chunks, media_type="text/plain")
+
+
 @app.get("/api/curriculum/{course_id}", response_model=CurriculumGenerationResponse, tags=["Curriculum"])
 def get_curriculum(course_id: str) -> CurriculumGenerationResponse:
     """Retrieve the most recently generated curriculum for a course."""
@@ -183,7 +277,7 @@ def get_curriculum(course_id: str) -> CurriculumGenerationResponse:
 # Lesson Note Generation Endpoints
 
 @app.post("/api/lessons/generate", response_model=LessonGenerationResponse, tags=["Lessons"])
-def generate_lesson_notes(request: LessonGenerationRequest) -> LessonGenerationResponse:
+async def generate_lesson_notes(request: LessonGenerationRequest) -> LessonGenerationResponse:
     """
     Generate detailed lesson notes for a specific topic.
     
@@ -194,7 +288,7 @@ def generate_lesson_notes(request: LessonGenerationRequest) -> LessonGenerationR
         LessonGenerationResponse with generated lesson notes
     """
     try:
-        response = lesson_service.generate_lesson_notes(
+        response = await lesson_service.generate_lesson_notes_async(
             course_id=request.course_id,
             topic_id=request.topic_id
         )
@@ -207,7 +301,7 @@ def generate_lesson_notes(request: LessonGenerationRequest) -> LessonGenerationR
         
         return response
     
-    except HTTPException:
+    except (HTTPException, GeminiBusyError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -216,6 +310,37 @@ def generate_lesson_notes(request: LessonGenerationRequest) -> LessonGenerationR
         )
 
 
+@app.post("/api/lessons/generate/stream", tags=["Lessons"])
+async def stream_lesson_notes(request: LessonGenerationRequest) -> StreamingResponse:
+    """
+    Generate lesson notes for a topic, streaming Gemini's raw JSON text as it is produced.
+    
+    The lesson is parsed and stored once the stream ends; fetch it with
+    GET /api/lessons/{course_id}. Errors before any text is produced get an
+    error status; later ones end the stream with an {"error": ...} line.
+    """
+    try:
+        chunks = await lesson_service.stream_lesson_notes(
+            course_id=request.course_id,
+            topic_id=request.topic_id
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+    try:
+        chunks = await _start_stream(chunks)
+    except GeminiBusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating lesson: {str(e)}"
+        )
+    return StreamingResponse(chunks, media_type="text/plain")
+
+
 @app.get("/api/lessons/{course_id}", response_model=List[Lesson], tags=["Lessons"])
 def get_course_lessons(course_id: str) -> List[Lesson]:
     """
@@ -398,7 +523,7 @@ def delete_lesson(lesson_id: str, course_id: str = None) -> dict:
 
 
 @app.post("/api/lessons/generate-from-topic", response_model=LessonGenerationResponse, tags=["Lessons"])
-def generate_lesson_from_topic(request: LessonGenerationRequest) -> LessonGenerationResponse:
+async def generate_lesson_from_topic(request: LessonGenerationRequest) -> LessonGenerationResponse:
     """
     Generate AI lesson notes from a curriculum topic.
     
@@ -409,7 +534,7 @@ def generate_lesson_from_topic(request: LessonGenerationRequest) -> LessonGenera
         LessonGenerationResponse with generated lesson
     """
     try:
-        response = lesson_service.generate_lesson_notes(
+        response = await lesson_service.generate_lesson_notes_async(
             course_id=request.course_id,
             topic_id=request.topic_id
         )
@@ -419,7 +544,7 @@ def generate_lesson_from_topic(request: LessonGenerationRequest) -> LessonGenera
                 detail=response.message
             )
         return response
-    except HTTPException:
+    except (HTTPException, GeminiBusyError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -699,7 +824,7 @@ def update_student_profile(student_id: str, updates: dict) -> dict:
 # Pretest Endpoints
 
 @app.post("/api/pretest/generate", response_model=Pretest, tags=["Pretest"])
-def generate_pretest(course_id: str = Query(..., description="Course identifier")) -> Pretest:
+async def generate_pretest(course_id: str = Query(..., description="Course identifier")) -> Pretest:
     """
     Generate pretest for a course (usually auto-called after curriculum generation).
     
@@ -710,13 +835,15 @@ def generate_pretest(course_id: str = Query(..., description="Course identifier"
         Generated Pretest object
     """
     try:
-        pretest = pretest_service.generate_pretest_for_curriculum(course_id)
+        pretest = await pretest_service.generate_pretest_for_curriculum_async(course_id)
         return pretest
     except ValueError as e:
         raise HTTPException(
             status_code=404,
             detail=str(e)
         )
+    except GeminiBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -753,7 +880,7 @@ def get_pretest(course_id: str) -> Pretest:
 
 
 @app.post("/api/pretest/submit", response_model=PretestResultResponse, tags=["Pretest"])
-def submit_pretest(request: PretestSubmissionRequest) -> PretestResultResponse:
+async def submit_pretest(request: PretestSubmissionRequest) -> PretestResultResponse:
     """
     Submit pretest answers and get results with analysis.
     
@@ -764,13 +891,15 @@ def submit_pretest(request: PretestSubmissionRequest) -> PretestResultResponse:
         PretestResultResponse with analysis and recommendations
     """
     try:
-        result = pretest_service.submit_pretest(request)
+        result = await pretest_service.submit_pretest_async(request)
         return result
     except ValueError as e:
         raise HTTPException(
             status_code=400,
             detail=str(e)
         )
+    except GeminiBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -805,7 +934,7 @@ def get_pretest_status(course_id: str, student_id: str) -> dict:
 
 
 @app.get("/api/pretest/{course_id}/results/{student_id}", response_model=PretestResultResponse, tags=["Pretest"])
-def get_pretest_results(course_id: str, student_id: str) -> PretestResultResponse:
+async def get_pretest_results(course_id: str, student_id: str) -> PretestResultResponse:
     """
     Get pretest results and analysis for a student.
     
@@ -817,14 +946,14 @@ def get_pretest_results(course_id: str, student_id: str) -> PretestResultRespons
         PretestResultResponse with analysis and recommendations
     """
     try:
-        result = pretest_service.get_pretest_result(student_id, course_id)
+        result = await pretest_service.get_pretest_result_async(student_id, course_id)
         if not result:
             raise HTTPException(
                 status_code=404,
                 detail="Pretest results not found. Student may not have completed the pretest."
             )
         return result
-    except HTTPException:
+    except (HTTPException, GeminiBusyError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -836,7 +965,7 @@ def get_pretest_results(course_id: str, student_id: str) -> PretestResultRespons
 # Weekly Quiz Endpoints
 
 @app.post("/api/quiz/generate-main/{course_id}/{week_number}", response_model=WeeklyQuiz, tags=["Quiz"])
-def generate_main_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
+async def generate_main_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
     """
     Generate main quiz for a specific week.
     
@@ -848,13 +977,15 @@ def generate_main_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
         Generated WeeklyQuiz object
     """
     try:
-        quiz = quiz_service.generate_main_quiz_for_week(course_id, week_number)
+        quiz = await quiz_service.generate_main_quiz_for_week_async(course_id, week_number)
         return quiz
     except ValueError as e:
         raise HTTPException(
             status_code=404,
             detail=str(e)
         )
+    except GeminiBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -893,7 +1024,7 @@ def get_quiz(course_id: str, week_number: int, quiz_type: str) -> WeeklyQuiz:
 
 
 @app.post("/api/quiz/generate-refresher/{course_id}/{week_number}", response_model=WeeklyQuiz, tags=["Quiz"])
-def generate_refresher_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
+async def generate_refresher_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
     """
     Generate a new refresher quiz for a week.
     
@@ -905,13 +1036,15 @@ def generate_refresher_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
         Generated WeeklyQuiz object
     """
     try:
-        quiz = quiz_service.generate_refresher_quiz(course_id, week_number)
+        quiz = await quiz_service.generate_refresher_quiz_async(course_id, week_number)
         return quiz
     except ValueError as e:
         raise HTTPException(
             status_code=404,
             detail=str(e)
         )
+    except GeminiBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -920,7 +1053,7 @@ def generate_refresher_quiz(course_id: str, week_number: int) -> WeeklyQuiz:
 
 
 @app.post("/api/quiz/generate-dynamic/{course_id}/{week_number}/{student_id}", response_model=WeeklyQuiz, tags=["Quiz"])
-def generate_dynamic_quiz(course_id: str, week_number: int, student_id: str) -> WeeklyQuiz:
+async def generate_dynamic_quiz(course_id: str, week_number: int, student_id: str) -> WeeklyQuiz:
     """
     Generate dynamic quiz targeting student's weak areas.
     
@@ -933,13 +1066,15 @@ def generate_dynamic_quiz(course_id: str, week_number: int, student_id: str) ->
         Generated WeeklyQuiz object
     """
     try:
-        quiz = quiz_service.generate_dynamic_quiz(course_id, week_number, student_id)
+        quiz = await quiz_service.generate_dynamic_quiz_async(course_id, week_number, student_id)
         return quiz
     except ValueError as e:
         raise HTTPException(
             status_code=400,
             detail=str(e)
         )
+    except GeminiBusyError:
+        raise
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -0,0 +1,25 @@
+"""
+Script to migrate the JSON database to the per-student storage layout.
+Run this once after upgrading, with the server stopped; it is safe to
+run again. The storage classes only read the new layout.
+
+Weekly quizzes are rewritten from a JSON array to an object keyed by
+"<courseId>|<weekNumber>|<quizType>". Quiz attempts move from
+weekly_quiz_attempts/weekly_quiz_attempts.json(l) to
+weekly_quiz_attempts/<studentId>.jsonl, and performance records move
+from student_performance/student_performance.json (or the earlier flat
+student_performance/<studentId>_<courseId>.json files) to
+student_performance/<studentId>/<courseId>.json.
+"""
+from pathlib import Path
+
+from storage.quiz_storage import migrate_legacy_attempts, migrate_legacy_quizzes
+from storage.strength_weakness_storage import migrate_legacy_performance
+
+BASE_DIR = Path(__file__).parent / "database"
+
+quizzes = migrate_legacy_quizzes(BASE_DIR)
+attempts = migrate_legacy_attempts(BASE_DIR)
+records = migrate_legacy_performance(BASE_DIR)
+
+print(f"Migrated {quizzes} quizzes, {attempts} quiz attempts and {records} performance records.")
@@ -1,12 +1,16 @@
 """
 Service for processing and parsing curriculum generation responses.
 """
-import json
-from typing import Dict, Any, List, Union
+import asyncio
+from typing import Dict, Any, AsyncIterator, List, Set, Union
+import orjson
 from models import CurriculumGenerationResponse, Week, Topic, Resource
-from utils.gemini_client import GeminiClient
+from config import settings
+from utils.gemini_client import get_gemini_client
+from utils.priority_gate import GeminiBusyError
 from storage.curriculum_storage import CurriculumStorage
 from services.pretest_service import PretestService
+from services.quiz_service import QuizService
 
 
 class CurriculumService:
@@ -14,11 +18,14 @@ class CurriculumService:
     
     def __init__(self):
         """Initialize curriculum service with Gemini client."""
-        self.gemini_client = GeminiClient()
+        self.gemini_client = get_gemini_client()
         self.storage = CurriculumStorage()
         self.pretest_service = PretestService()
+        self.quiz_service = QuizService()
+        # Keeps background quiz generation alive until it finishes
+        self._quiz_tasks: Set[asyncio.Task] = set()
     
-    def generate_curriculum(
+    async def generate_curriculum_async(
         self,
         course_id: str,
         syllabus_content: str,
@@ -30,6 +37,9 @@ class CurriculumService:
         """
         Generate curriculum using Gemini and parse response.
         
+        The follow-up pretest is generated before returning; the main
+        quizzes and refresher pools are then generated in the background.
+        
         Args:
             syllabus_content: Uploaded file content (optional)
             course_outline: Pasted outline text (optional)
@@ -41,57 +51,132 @@ class CurriculumService:
             CurriculumGenerationResponse with parsed curriculum
         """
         try:
-            # Use syllabus_content if provided, otherwise use course_outline
-            content = syllabus_content or course_outline
-
-            if not content:
-                raise ValueError("No syllabus content or course outline provided")
-            
-            # Call Gemini API
-            gemini_response = self.gemini_client.generate_curriculum(
-                content=content,
+            gemini_response = await self.gemini_client.generate_curriculum_async(
+                content=self._select_content(syllabus_content, course_outline),
                 number_of_weeks=number_of_weeks,
                 include_study_materials=include_study_materials,
                 include_media_links=include_media_links
             )
             
-            # Parse JSON response
-            parsed_data = self._parse_gemini_response(gemini_response)
-            
-            # Convert to response model
-            response = CurriculumGenerationResponse(
-                course_id=course_id,
-                success=True,
-                message="Curriculum generated successfully",
-                weeks=parsed_data
-            )
-
-            # Persist curriculum for later retrieval
-            self.storage.save(response)
-            
-            # Automatically generate pretest after successful curriculum creation
-            try:
-                self.pretest_service.generate_pretest_for_curriculum(course_id)
-            except Exception as e:
-                # Log error but don't fail curriculum generation
-                print(f"Warning: Failed to generate pretest for course {course_id}: {str(e)}")
-            
+            response = await asyncio.to_thread(self._save_generated_curriculum, course_id, gemini_response)
+            await self._generate_pretest_async(course_id)
+            self._schedule_quizzes(course_id)
             return response
         
-        except json.JSONDecodeError as e:
-            return CurriculumGenerationResponse(
-                course_id=course_id,
-                success=False,
-                message=f"Failed to parse Gemini response: {str(e)}",
-                weeks=[]
-            )
+        except GeminiBusyError:
+            raise
         except Exception as e:
-            return CurriculumGenerationResponse(
-                course_id=course_id,
-                success=False,
-                message=f"Error generating curriculum: {str(e)}",
-                weeks=[]
-            )
+            return self._failure_response(course_id, e)
+
+    async def stream_curriculum(
+        self,
+        course_id: str,
+        syllabus_content: str,
+        course_outline: str,
+        number_of_weeks: int,
+        include_study_materials: bool,
+        include_media_links: bool
+    ) -> AsyncIterator[str]:
+        """
+        Generate curriculum, yielding Gemini's raw JSON text as it streams in.
+        
+        Once the stream completes the full text is parsed and saved exactly
+        like generate_curriculum_async, the pretest is generated, and the quizzes
+        are scheduled as in generate_curriculum_async. The stored
+        curriculum can then be fetched with get_curriculum.
+        
+        Yields:
+            Consecutive chunks of the curriculum JSON text
+        
+        Raises:
+            ValueError: If no content is provided or the response cannot be parsed
+        """
+        chunks: List[str] = []
+        async for chunk in self.gemini_client.generate_curriculum_stream(
+            content=self._select_content(syllabus_content, course_outline),
+            number_of_weeks=number_of_weeks,
+            include_study_materials=include_study_materials,
+            include_media_links=include_media_links
+        ):
+            chunks.append(chunk)
+            yield chunk
+        
+        try:
+            await asyncio.to_thread(self._save_generated_curriculum, course_id, "".join(chunks))
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse Gemini response: {str(e)}") from e
+        await self._generate_pretest_async(course_id)
+        self._schedule_quizzes(course_id)
+
+    def _select_content(self, syllabus_content: str, course_outline: str) -> str:
+        """Use syllabus_content if provided, otherwise use course_outline."""
+        content = syllabus_content or course_outline
+        if not content:
+            raise ValueError("No syllabus content or course outline provided")
+        return content
+
+    def _save_generated_curriculum(
+        self,
+        course_id: str,
+        gemini_response: str
+    ) -> CurriculumGenerationResponse:
+        """Parse Gemini's curriculum response and persist it."""
+        # Parse JSON response
+        parsed_data = self._parse_gemini_response(gemini_response)
+        
+        # Convert to response model
+        response = CurriculumGenerationResponse(
+            course_id=course_id,
+            success=True,
+            message="Curriculum generated successfully",
+            weeks=parsed_data
+        )
+
+        # Persist curriculum for later retrieval
+        self.storage.save(response)
+        return response
+
+    async def _generate_pretest_async(self, course_id: str) -> None:
+        """Automatically generate pretest after successful curriculum creation."""
+        try:
+            await self.pretest_service.generate_pretest_for_curriculum_async(course_id)
+        except Exception as e:
+            # Log error but don't fail curriculum generation
+            print(f"Warning: Failed to generate pretest for course {course_id}: {str(e)}")
+
+    def _schedule_quizzes(self, course_id: str) -> None:
+        """
+        Start generating every week's quizzes without waiting for them.
+        
+        Students then find each main quiz and their first refresher quizzes
+        ready instead of waiting on Gemini; anything that fails is
+        generated on demand.
+        """
+        task = asyncio.create_task(self._generate_quizzes_async(course_id))
+        self._quiz_tasks.add(task)
+        task.add_done_callback(self._quiz_tasks.discard)
+
+    async def _generate_quizzes_async(self, course_id: str) -> None:
+        """Generate all main quizzes, then fill the refresher pools; failures are logged."""
+        try:
+            await self.quiz_service.generate_main_quizzes_async(course_id)
+            if settings.refresher_pool_size > 0:
+                await self.quiz_service.pregenerate_refresher_quizzes_async(course_id)
+        except Exception as e:
+            print(f"Warning: Failed to generate quizzes for course {course_id}: {str(e)}")
+
+    def _failure_response(self, course_id: str, error: Exception) -> CurriculumGenerationResponse:
+        """Build the unsuccessful response for a generation error."""
+        if isinstance(error, orjson.JSONDecodeError):
+            message = f"Failed to parse Gemini response: {str(error)}"
+        else:
+            message = f"Error generating curriculum: {str(error)}"
+        return CurriculumGenerationResponse(
+            course_id=course_id,
+            success=False,
+            message=message,
+            weeks=[]
+        )
 
     def get_curriculum(self, course_id: str) -> CurriculumGenerationResponse | None:
         """Retrieve stored curriculum for a course."""
@@ -138,7 +223,7 @@ class CurriculumService:
         json_str = self._extract_json(response_text)
         
         # Parse JSON
-        data = json.loads(json_str)
+        data = orjson.loads(json_str)
         
         # Convert to Week objects
         weeks = []
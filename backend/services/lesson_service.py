@@ -1,11 +1,13 @@
 """
 Service for lesson note generation and management.
 """
-import json
+import asyncio
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
+import orjson
 from models import (
+    Topic,
     Lesson,
     LessonNote,
     LessonSection,
@@ -17,7 +19,8 @@ from models import (
     TopicWithLessons,
     LessonsByTopicResponse
 )
-from utils.gemini_client import GeminiClient
+from utils.gemini_client import get_gemini_client
+from utils.priority_gate import GeminiBusyError
 from storage.lesson_storage import LessonStorage
 from storage.curriculum_storage import CurriculumStorage
 from storage.file_storage import FileStorage
@@ -29,12 +32,12 @@ class LessonService:
     
     def __init__(self):
         """Initialize lesson service with required clients and storage."""
-        self.gemini_client = GeminiClient()
+        self.gemini_client = get_gemini_client()
         self.lesson_storage = LessonStorage()
         self.curriculum_storage = CurriculumStorage()
         self.file_storage = FileStorage()
     
-    def generate_lesson_notes(
+    async def generate_lesson_notes_async(
         self,
         course_id: str,
         topic_id: str
@@ -50,80 +53,140 @@ class LessonService:
             LessonGenerationResponse with generated lesson
         """
         try:
-            # 1. Fetch curriculum to get topic details
-            curriculum = self.curriculum_storage.load(course_id)
-            if not curriculum:
-                return LessonGenerationResponse(
-                    success=False,
-                    message=f"Curriculum not found for course {course_id}",
-                    lesson=None
-                )
-            
-            # Find the topic
-            topic = None
-            for week in curriculum.weeks:
-                for t in week.topics:
-                    if t.id == topic_id:
-                        topic = t
-                        break
-                if topic:
-                    break
-            
-            if not topic:
-                return LessonGenerationResponse(
-                    success=False,
-                    message=f"Topic {topic_id} not found in curriculum",
-                    lesson=None
-                )
+            topic, failure = await asyncio.to_thread(self._find_topic, course_id, topic_id)
+            if failure:
+                return failure
             
-            # 2. Call Gemini to generate lesson notes
-            gemini_response = self.gemini_client.generate_lesson_notes(
+            gemini_response = await self.gemini_client.generate_lesson_notes_async(
                 topic_title=topic.title,
                 topic_description=topic.description,
                 topic_resources=topic.resources or []
             )
             
-            # 3. Parse response into LessonNote object
-            lesson_note = self._parse_lesson_notes_response(
-                gemini_response,
-                topic_id,
-                topic.title
-            )
-            
-            # 4. Create Lesson object with generated ID
-            lesson_id = str(uuid.uuid4())
-            lesson = Lesson(
-                id=lesson_id,
-                topic_id=topic_id,
-                course_id=course_id,
-                title=topic.title,
-                notes=lesson_note,
-                created_at=datetime.utcnow().isoformat(),
-                type="ai_generated"
-            )
-            
-            # 5. Store lesson in storage
-            self.lesson_storage.save(lesson)
-            
-            # 6. Return response with lesson object
-            return LessonGenerationResponse(
-                success=True,
-                message="Lesson notes generated successfully",
-                lesson=lesson
-            )
+            return await asyncio.to_thread(self._save_generated_lesson, course_id, topic, gemini_response)
         
-        except json.JSONDecodeError as e:
-            return LessonGenerationResponse(
-                success=False,
-                message=f"Failed to parse Gemini response: {str(e)}",
-                lesson=None
-            )
+        except GeminiBusyError:
+            raise
         except Exception as e:
-            return LessonGenerationResponse(
+            return self._failure_response(e)
+    
+    async def stream_lesson_notes(
+        self,
+        course_id: str,
+        topic_id: str
+    ) -> AsyncIterator[str]:
+        """
+        Generate lesson notes for a topic, yielding Gemini's raw JSON text as it streams in.
+        
+        The topic is looked up before anything is streamed. Once the stream
+        completes the notes are parsed and stored exactly like
+        generate_lesson_notes_async; fetch the lesson with get_lessons_for_course.
+        
+        Returns:
+            Async iterator over consecutive chunks of the lesson notes JSON text
+        
+        Raises:
+            ValueError: If the curriculum or topic cannot be found
+        """
+        topic, failure = await asyncio.to_thread(self._find_topic, course_id, topic_id)
+        if failure:
+            raise ValueError(failure.message)
+        return self._stream_and_save_lesson(course_id, topic)
+    
+    async def _stream_and_save_lesson(self, course_id: str, topic: Topic) -> AsyncIterator[str]:
+        """Forward streamed lesson notes, then parse and store them."""
+        chunks: List[str] = []
+        async for chunk in self.gemini_client.generate_lesson_notes_stream(
+            topic_title=topic.title,
+            topic_description=topic.description,
+            topic_resources=topic.resources or []
+        ):
+            chunks.append(chunk)
+            yield chunk
+        
+        try:
+            await asyncio.to_thread(self._save_generated_lesson, course_id, topic, "".join(chunks))
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse Gemini response: {str(e)}") from e
+    
+    def _find_topic(
+        self,
+        course_id: str,
+        topic_id: str
+    ) -> Tuple[Optional[Topic], Optional[LessonGenerationResponse]]:
+        """
+        Look up a topic in the course curriculum.
+        
+        Returns:
+            (topic, None) if found, otherwise (None, unsuccessful response)
+        """
+        curriculum = self.curriculum_storage.load(course_id)
+        if not curriculum:
+            return None, LessonGenerationResponse(
                 success=False,
-                message=f"Error generating lesson notes: {str(e)}",
+                message=f"Curriculum not found for course {course_id}",
                 lesson=None
             )
+        
+        # Find the topic
+        for week in curriculum.weeks:
+            for t in week.topics:
+                if t.id == topic_id:
+                    return t, None
+        
+        return None, LessonGenerationResponse(
+            success=False,
+            message=f"Topic {topic_id} not found in curriculum",
+            lesson=None
+        )
+    
+    def _save_generated_lesson(
+        self,
+        course_id: str,
+        topic: Topic,
+        gemini_response: str
+    ) -> LessonGenerationResponse:
+        """Parse Gemini's lesson notes, store the lesson and build the response."""
+        # 3. Parse response into LessonNote object
+        lesson_note = self._parse_lesson_notes_response(
+            gemini_response,
+            topic.id,
+            topic.title
+        )
+        
+        # 4. Create Lesson object with generated ID
+        lesson_id = str(uuid.uuid4())
+        lesson = Lesson(
+            id=lesson_id,
+            topic_id=topic.id,
+            course_id=course_id,
+            title=topic.title,
+            notes=lesson_note,
+            created_at=datetime.utcnow().isoformat(),
+            type="ai_generated"
+        )
+        
+        # 5. Store lesson in storage
+        self.lesson_storage.save(lesson)
+        
+        # 6. Return response with lesson object
+        return LessonGenerationResponse(
+            success=True,
+            message="Lesson notes generated successfully",
+            lesson=lesson
+        )
+    
+    def _failure_response(self, error: Exception) -> LessonGenerationResponse:
+        """Build the unsuccessful response for a generation error."""
+        if isinstance(error, orjson.JSONDecodeError):
+            message = f"Failed to parse Gemini response: {str(error)}"
+        else:
+            message = f"Error generating lesson notes: {str(error)}"
+        return LessonGenerationResponse(
+            success=False,
+            message=message,
+            lesson=None
+        )
     
     def get_lessons_for_course(self, course_id: str) -> List[Lesson]:
         """
@@ -172,8 +235,8 @@ class LessonService:
         
         # Parse JSON with better error handling
         try:
-            data = json.loads(json_str)
-        except json.JSONDecodeError as e:
+            data = orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
             # Try to provide more helpful error message
             error_msg = f"JSON parsing error at position {e.pos}: {e.msg}"
             # Log the problematic section for debugging
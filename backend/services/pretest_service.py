@@ -1,18 +1,25 @@
 """
 Service for handling pretest generation, grading, and analysis.
 """
-import json
+import asyncio
 import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any, List
+import orjson
 from models import (
     Pretest, PretestQuestion, PretestAttempt, PretestAnalysis,
     TopicPerformance, TopicRecommendation, PretestResultResponse,
     PretestSubmissionRequest, CurriculumGenerationResponse
 )
-from utils.gemini_client import GeminiClient
+from utils.gemini_client import get_gemini_client
+from utils.priority_gate import GeminiBusyError
 from storage.pretest_storage import PretestStorage
 from storage.curriculum_storage import CurriculumStorage
+from config import settings
+
+
+# Questions asked about first-week topics when a pretest is generated in sections
+FIRST_WEEK_QUESTIONS = 3
 
 
 class PretestService:
@@ -20,31 +27,79 @@ class PretestService:
 
     def __init__(self):
         """Initialize pretest service with Gemini client and storage."""
-        self.gemini_client = GeminiClient()
+        self.gemini_client = get_gemini_client()
         self.storage = PretestStorage()
         self.curriculum_storage = CurriculumStorage()
 
-    def generate_pretest_for_curriculum(self, course_id: str) -> Pretest:
+    async def generate_pretest_for_curriculum_async(self, course_id: str) -> Pretest:
         """
         Generate pretest for a course based on its curriculum.
         
+        Instead of one long prompt, the pretest is generated as smaller
+        sections requested concurrently: one prerequisite section for the
+        whole course plus one question per first-week topic (up to
+        FIRST_WEEK_QUESTIONS). At most settings.gemini_max_concurrency calls
+        run at once.
+        
         Args:
             course_id: Course identifier
             
         Returns:
             Generated Pretest object
         """
-        # Load curriculum
-        curriculum = self.curriculum_storage.load(course_id)
+        curriculum = await asyncio.to_thread(self.curriculum_storage.load, course_id)
         if not curriculum or not curriculum.weeks:
             raise ValueError(f"No curriculum found for course {course_id}")
 
-        # Convert curriculum to dict for Gemini
-        curriculum_dict = curriculum.model_dump()
+        topics = [topic for week in curriculum.weeks for topic in week.topics]
+        first_week_topics = topics[:len(curriculum.weeks[0].topics)][:FIRST_WEEK_QUESTIONS]
 
-        # Generate pretest questions using Gemini
-        gemini_response = self.gemini_client.generate_pretest(curriculum_dict)
+        semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
 
+        async def limited(call):
+            async with semaphore:
+                return await call
+
+        sections = await asyncio.gather(
+            limited(self.gemini_client.generate_prerequisite_questions_async(topics)),
+            *[
+                limited(self.gemini_client.generate_topic_questions_async(topic, 1))
+                for topic in first_week_topics
+            ],
+            return_exceptions=True
+        )
+
+        # Keep whatever sections succeeded; fail only if none did
+        merged: List[Dict[str, Any]] = []
+        for section in sections:
+            if isinstance(section, Exception):
+                print(f"Warning: Failed to generate pretest section for course {course_id}: {str(section)}")
+                continue
+            try:
+                merged.extend(orjson.loads(self._extract_json(section)).get("questions", []))
+            except ValueError as e:
+                print(f"Warning: Failed to parse pretest section for course {course_id}: {str(e)}")
+        if not merged:
+            # Turned away by the Gemini queue rather than failed: let the caller retry
+            for section in sections:
+                if isinstance(section, GeminiBusyError):
+                    raise section
+            raise RuntimeError(f"Failed to generate pretest questions for course {course_id}")
+
+        for idx, q_data in enumerate(merged, 1):
+            q_data["id"] = f"q{idx}"
+
+        return await asyncio.to_thread(
+            self._save_generated_pretest, course_id, curriculum, orjson.dumps({"questions": merged}).decode()
+        )
+
+    def _save_generated_pretest(
+        self,
+        course_id: str,
+        curriculum: CurriculumGenerationResponse,
+        gemini_response: str
+    ) -> Pretest:
+        """Parse Gemini's pretest questions, then create and store the pretest."""
         # Parse response
         questions_data = self._parse_pretest_response(gemini_response, curriculum)
 
@@ -66,7 +121,7 @@ class PretestService:
         """Retrieve pretest for a course."""
         return self.storage.get_pretest(course_id)
 
-    def submit_pretest(
+    async def submit_pretest_async(
         self,
         request: PretestSubmissionRequest
     ) -> PretestResultResponse:
@@ -80,7 +135,7 @@ class PretestService:
             Complete result with analysis and recommendations
         """
         # Get pretest
-        pretest = self.storage.get_pretest(request.courseId)
+        pretest = await asyncio.to_thread(self.storage.get_pretest, request.courseId)
         if not pretest:
             raise ValueError(f"No pretest found for course {request.courseId}")
 
@@ -112,7 +167,7 @@ class PretestService:
         )
 
         # Save attempt
-        self.storage.save_attempt(attempt)
+        await asyncio.to_thread(self.storage.save_attempt, attempt)
 
         # Generate analysis
         analysis = self._generate_analysis(pretest, attempt, request.answers)
@@ -120,7 +175,7 @@ class PretestService:
         # Generate recommendation if score < 85%
         recommendation = None
         if percentage < 85:
-            recommendation = self._generate_recommendation(
+            recommendation = await self._generate_recommendation_async(
                 pretest, analysis, request.courseId
             )
 
@@ -134,17 +189,17 @@ class PretestService:
         """Check if student has completed pretest."""
         return self.storage.has_completed_pretest(student_id, course_id)
 
-    def get_pretest_result(
+    async def get_pretest_result_async(
         self,
         student_id: str,
         course_id: str
     ) -> Optional[PretestResultResponse]:
         """Get existing pretest result for a student."""
-        attempt = self.storage.get_attempt(student_id, course_id)
+        attempt = await asyncio.to_thread(self.storage.get_attempt, student_id, course_id)
         if not attempt:
             return None
 
-        pretest = self.storage.get_pretest(course_id)
+        pretest = await asyncio.to_thread(self.storage.get_pretest, course_id)
         if not pretest:
             return None
 
@@ -154,7 +209,7 @@ class PretestService:
         # Generate recommendation if needed
         recommendation = None
         if attempt.percentage < 85:
-            recommendation = self._generate_recommendation(
+            recommendation = await self._generate_recommendation_async(
                 pretest, analysis, course_id
             )
 
@@ -181,7 +236,7 @@ class PretestService:
         """
         # Extract JSON from response
         json_str = self._extract_json(response_text)
-        data = json.loads(json_str)
+        data = orjson.loads(json_str)
 
         # Create topic mapping for reference
         topic_map = {}
@@ -305,7 +360,7 @@ class PretestService:
             weaknesses=weaknesses
         )
 
-    def _generate_recommendation(
+    async def _generate_recommendation_async(
         self,
         pretest: Pretest,
         analysis: PretestAnalysis,
@@ -345,7 +400,7 @@ class PretestService:
             return None
 
         # Get curriculum for topic description
-        curriculum = self.curriculum_storage.load(course_id)
+        curriculum = await asyncio.to_thread(self.curriculum_storage.load, course_id)
         topic_description = ""
         if curriculum:
             for week in curriculum.weeks:
@@ -357,7 +412,7 @@ class PretestService:
         # Generate recommendation using Gemini
         performance_desc = f"Scored {weakest_topic.correctCount} out of {weakest_topic.questionsCount} questions ({weakest_topic.percentage:.1f}%)"
         
-        gemini_response = self.gemini_client.generate_recommendation(
+        gemini_response = await self.gemini_client.generate_recommendation_async(
             topic_id=weakest_topic.topicId,
             topic_title=weakest_topic.topicTitle,
             topic_description=topic_description,
@@ -366,7 +421,7 @@ class PretestService:
 
         # Parse recommendation
         json_str = self._extract_json(gemini_response)
-        rec_data = json.loads(json_str)
+        rec_data = orjson.loads(json_str)
 
         return TopicRecommendation(
             topicId=rec_data.get("topicId", weakest_topic.topicId),
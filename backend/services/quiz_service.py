@@ -1,32 +1,63 @@
 """
 Service for handling weekly quiz generation, grading, and analysis.
 """
-import json
+import asyncio
+import traceback
 import uuid
+import weakref
+from collections import defaultdict, deque
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Deque, List, Set, Tuple
+import orjson
 from models import (
     WeeklyQuiz, WeeklyQuizQuestion, WeeklyQuizAttempt, QuizAnalysis,
     QuizTopicPerformance, QuizSubmissionRequest, QuizSubmissionResponse,
-    QuizAvailabilityResponse, QuizProgress, StudentStrengthWeakness
+    QuizAvailabilityResponse, QuizProgress, StudentStrengthWeakness, Week, Topic
 )
-from utils.gemini_client import GeminiClient
+from config import settings
+from utils.gemini_client import get_gemini_client
+from utils.priority_gate import GeminiBusyError, LOW
 from storage.quiz_storage import QuizStorage
 from storage.curriculum_storage import CurriculumStorage
 from storage.strength_weakness_storage import StrengthWeaknessStorage
 
 
+# Refresher quiz responses generated ahead of time, keyed by (course_id,
+# week_number) and shared by every QuizService in the process. Each entry
+# keeps the topics it was generated for, so a regenerated curriculum never
+# serves outdated questions.
+_refresher_pool: Dict[Tuple[str, int], Deque[Tuple[List[Topic], str]]] = defaultdict(deque)
+# Weeks whose pool is being topped up, and the background tasks doing it
+_refilling: Set[Tuple[str, int]] = set()
+_refill_tasks: Set[asyncio.Task] = set()
+# Bounds the refill calls in flight across every week and request. Kept per
+# event loop (one per process when serving) since a semaphore cannot be
+# shared between loops.
+_refill_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _refill_semaphore() -> asyncio.Semaphore:
+    """Return the refill semaphore of the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _refill_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _refill_semaphores[loop] = asyncio.Semaphore(settings.gemini_max_concurrency)
+    return semaphore
+
+
 class QuizService:
     """Service to handle weekly quiz operations."""
 
     def __init__(self):
         """Initialize quiz service with Gemini client and storage."""
-        self.gemini_client = GeminiClient()
+        self.gemini_client = get_gemini_client()
         self.storage = QuizStorage()
         self.curriculum_storage = CurriculumStorage()
-        self.performance_storage = StrengthWeaknessStorage()
+        self.performance_storage = StrengthWeaknessStorage(quiz_storage=self.storage)
 
-    def generate_main_quiz_for_week(
+    async def generate_main_quiz_for_week_async(
         self,
         course_id: str,
         week_number: int
@@ -41,6 +72,82 @@ class QuizService:
         Returns:
             Generated WeeklyQuiz object
         """
+        current_week, previous_week = await asyncio.to_thread(self._main_quiz_weeks, course_id, week_number)
+
+        gemini_response = await self.gemini_client.generate_main_quiz_async(
+            week_number=week_number,
+            current_week_topics=current_week.topics,
+            previous_week_topics=previous_week.topics if previous_week else None
+        )
+
+        return await asyncio.to_thread(self._save_main_quiz, course_id, week_number, current_week, gemini_response)
+
+    async def generate_main_quizzes_async(self, course_id: str) -> List[WeeklyQuiz]:
+        """
+        Generate the missing or outdated main quizzes of a course concurrently.
+        
+        A week keeps its main quiz if one exists for the same topics, so
+        regenerating a curriculum never replaces a quiz students may be
+        taking unless the week's content changed. At most
+        settings.gemini_max_concurrency Gemini calls are in flight, and they
+        queue behind requests a student is waiting on. A week that fails is
+        logged and skipped; it is generated on demand later.
+        
+        Args:
+            course_id: Course identifier
+            
+        Returns:
+            The WeeklyQuiz objects that were generated
+        """
+        curriculum = await asyncio.to_thread(self.curriculum_storage.load, course_id)
+        if not curriculum or not curriculum.weeks:
+            raise ValueError(f"No curriculum found for course {course_id}")
+
+        weeks_by_number = {week.week_number: week for week in curriculum.weeks}
+        weeks = await asyncio.to_thread(self._outdated_main_quiz_weeks, course_id, curriculum.weeks)
+        semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+
+        async def one(week: Week) -> WeeklyQuiz:
+            previous_week = weeks_by_number.get(week.week_number - 1)
+            async with semaphore:
+                gemini_response = await self.gemini_client.generate_main_quiz_async(
+                    week_number=week.week_number,
+                    current_week_topics=week.topics,
+                    previous_week_topics=previous_week.topics if previous_week else None,
+                    priority=LOW
+                )
+            return await asyncio.to_thread(self._save_main_quiz, course_id, week.week_number, week, gemini_response)
+
+        results = await asyncio.gather(*[one(week) for week in weeks], return_exceptions=True)
+
+        quizzes = []
+        for week, result in zip(weeks, results):
+            if isinstance(result, BaseException):
+                print(f"Warning: Failed to generate main quiz for course {course_id} week {week.week_number}: {str(result)}")
+            else:
+                quizzes.append(result)
+        return quizzes
+
+    def _outdated_main_quiz_weeks(self, course_id: str, weeks: List[Week]) -> List[Week]:
+        """Return the weeks that have no main quiz, or whose main quiz covers other topics."""
+        outdated = []
+        for week in weeks:
+            quiz = self.storage.get_quiz(course_id, week.week_number, "main")
+            if quiz is None or quiz.topicIds != [topic.id for topic in week.topics]:
+                outdated.append(week)
+        return outdated
+
+    def _main_quiz_weeks(
+        self,
+        course_id: str,
+        week_number: int
+    ) -> Tuple[Week, Optional[Week]]:
+        """
+        Look up the weeks a main quiz covers.
+        
+        Returns:
+            (current week, previous week or None)
+        """
         # Load curriculum
         curriculum = self.curriculum_storage.load(course_id)
         if not curriculum or not curriculum.weeks:
@@ -59,19 +166,16 @@ class QuizService:
         if not current_week:
             raise ValueError(f"Week {week_number} not found in curriculum")
 
-        # Convert topics to dict format for Gemini
-        current_topics = [topic.model_dump() for topic in current_week.topics]
-        previous_topics = None
-        if previous_week:
-            previous_topics = [topic.model_dump() for topic in previous_week.topics]
-
-        # Generate quiz questions using Gemini
-        gemini_response = self.gemini_client.generate_main_quiz(
-            week_number=week_number,
-            current_week_topics=current_topics,
-            previous_week_topics=previous_topics
-        )
+        return current_week, previous_week
 
+    def _save_main_quiz(
+        self,
+        course_id: str,
+        week_number: int,
+        current_week: Week,
+        gemini_response: str
+    ) -> WeeklyQuiz:
+        """Parse Gemini's main quiz response and persist the quiz."""
         # Parse response
         questions_data = self._parse_quiz_response(gemini_response, current_week.topics)
 
@@ -94,7 +198,7 @@ class QuizService:
 
         return quiz
 
-    def generate_refresher_quiz(
+    async def generate_refresher_quiz_async(
         self,
         course_id: str,
         week_number: int
@@ -103,6 +207,10 @@ class QuizService:
         Generate a new refresher quiz for a week.
         Questions change each time but cover same concepts.
         
+        Serves a pre-generated quiz from the week's refresher pool when one
+        is ready and only awaits Gemini when the pool is empty. Either way
+        the pool is topped back up in the background.
+        
         Args:
             course_id: Course identifier
             week_number: Week number
@@ -110,30 +218,112 @@ class QuizService:
         Returns:
             Generated WeeklyQuiz object
         """
+        current_week = await asyncio.to_thread(self._find_week, course_id, week_number)
+
+        pool = self._refresher_pool_for(course_id, current_week)
+        if pool:
+            _, gemini_response = pool.popleft()
+        else:
+            gemini_response = await self.gemini_client.generate_refresher_quiz_async(
+                week_number=week_number,
+                topics=current_week.topics
+            )
+        self._schedule_refresher_refill(course_id, current_week)
+
+        return await asyncio.to_thread(self._save_refresher_quiz, course_id, week_number, current_week, gemini_response)
+
+    async def pregenerate_refresher_quizzes_async(self, course_id: str) -> None:
+        """
+        Fill every week's refresher pool up to settings.refresher_pool_size.
+        
+        Refills of every course share one limit of
+        settings.gemini_max_concurrency Gemini calls in flight per process,
+        and they queue behind requests a student is waiting on. Failed calls
+        are logged and skipped.
+        
+        Args:
+            course_id: Course identifier
+        """
+        curriculum = await asyncio.to_thread(self.curriculum_storage.load, course_id)
+        if not curriculum or not curriculum.weeks:
+            raise ValueError(f"No curriculum found for course {course_id}")
+
+        await asyncio.gather(*[
+            self._refill_refresher_pool(course_id, week)
+            for week in curriculum.weeks
+        ])
+
+    def _refresher_pool_for(self, course_id: str, week: Week) -> Deque[Tuple[List[Topic], str]]:
+        """Return a week's refresher pool, dropping responses for outdated topics."""
+        pool = _refresher_pool[(course_id, week.week_number)]
+        current = [entry for entry in pool if entry[0] == week.topics]
+        if len(current) != len(pool):
+            pool.clear()
+            pool.extend(current)
+        return pool
+
+    def _schedule_refresher_refill(self, course_id: str, week: Week) -> None:
+        """Top a week's refresher pool back up without waiting for it."""
+        if settings.refresher_pool_size <= 0:
+            return
+        task = asyncio.create_task(self._refill_refresher_pool(course_id, week))
+        _refill_tasks.add(task)
+        task.add_done_callback(_refill_tasks.discard)
+
+    async def _refill_refresher_pool(self, course_id: str, week: Week) -> None:
+        """Generate refresher quizzes at LOW priority until the week's pool is full."""
+        key = (course_id, week.week_number)
+        if key in _refilling:
+            return
+        _refilling.add(key)
+        try:
+            missing = settings.refresher_pool_size - len(self._refresher_pool_for(course_id, week))
+
+            async def one() -> str:
+                async with _refill_semaphore():
+                    return await self.gemini_client.generate_refresher_quiz_async(
+                        week_number=week.week_number,
+                        topics=week.topics,
+                        priority=LOW
+                    )
+
+            results = await asyncio.gather(*[one() for _ in range(missing)], return_exceptions=True)
+            pool = _refresher_pool[key]
+            for result in results:
+                if isinstance(result, BaseException):
+                    print(f"Warning: Failed to pre-generate refresher quiz for course {course_id} week {week.week_number}: {str(result)}")
+                else:
+                    pool.append((week.topics, result))
+        finally:
+            _refilling.discard(key)
+
+    def _find_week(self, course_id: str, week_number: int) -> Week:
+        """
+        Look up a week in the course curriculum.
+        
+        Raises:
+            ValueError: If the curriculum or the week does not exist
+        """
         # Load curriculum
         curriculum = self.curriculum_storage.load(course_id)
         if not curriculum or not curriculum.weeks:
             raise ValueError(f"No curriculum found for course {course_id}")
 
         # Find current week
-        current_week = None
         for week in curriculum.weeks:
             if week.week_number == week_number:
-                current_week = week
-                break
-
-        if not current_week:
-            raise ValueError(f"Week {week_number} not found in curriculum")
-
-        # Convert topics to dict format for Gemini
-        topics = [topic.model_dump() for topic in current_week.topics]
+                return week
 
-        # Generate quiz questions using Gemini
-        gemini_response = self.gemini_client.generate_refresher_quiz(
-            week_number=week_number,
-            topics=topics
-        )
+        raise ValueError(f"Week {week_number} not found in curriculum")
 
+    def _save_refresher_quiz(
+        self,
+        course_id: str,
+        week_number: int,
+        current_week: Week,
+        gemini_response: str
+    ) -> WeeklyQuiz:
+        """Parse Gemini's refresher quiz response and persist the quiz."""
         # Parse response
         questions_data = self._parse_quiz_response(gemini_response, current_week.topics)
 
@@ -156,7 +346,7 @@ class QuizService:
 
         return quiz
 
-    def generate_dynamic_quiz(
+    async def generate_dynamic_quiz_async(
         self,
         course_id: str,
         week_number: int,
@@ -173,91 +363,103 @@ class QuizService:
         Returns:
             Generated WeeklyQuiz object
         """
-        import traceback
-        
         try:
-            # Load curriculum
-            curriculum = self.curriculum_storage.load(course_id)
-            if not curriculum or not curriculum.weeks:
-                raise ValueError(f"No curriculum found for course {course_id}")
-
-            # Find current week
-            current_week = None
-            for week in curriculum.weeks:
-                if week.week_number == week_number:
-                    current_week = week
-                    break
-
-            if not current_week:
-                raise ValueError(f"Week {week_number} not found in curriculum")
-
-            # Get student's weaknesses
-            performance = self.performance_storage.get_student_performance(student_id, course_id)
-            weaknesses = performance.weaknesses if performance else []
-
-            # Filter weaknesses to only include topics from current week
-            current_week_topic_ids = [topic.id for topic in current_week.topics]
-            relevant_weaknesses = [w for w in weaknesses if w in current_week_topic_ids]
-
-            # If no relevant weaknesses found, use all topics from current week as focus areas
-            # This can happen if student hasn't taken quizzes for this week yet
-            if not relevant_weaknesses:
-                # Use all current week topics as focus areas for the dynamic quiz
-                relevant_weaknesses = current_week_topic_ids
-
-            # Convert topics to dict format for Gemini
-            topics = [topic.model_dump() for topic in current_week.topics]
-            
-            if not topics:
-                raise ValueError(f"No topics found for week {week_number}")
+            current_week, relevant_weaknesses = await asyncio.to_thread(
+                self._dynamic_quiz_focus, course_id, week_number, student_id
+            )
 
-            # Generate quiz questions using Gemini
             try:
-                gemini_response = self.gemini_client.generate_dynamic_quiz(
+                gemini_response = await self.gemini_client.generate_dynamic_quiz_async(
                     week_number=week_number,
-                    topics=topics,
+                    topics=current_week.topics,
                     student_weaknesses=relevant_weaknesses
                 )
+            except GeminiBusyError:
+                raise
             except Exception as e:
                 error_trace = traceback.format_exc()
                 print(f"Gemini API error: {error_trace}")
                 raise ValueError(f"Failed to generate dynamic quiz questions: {str(e)}")
 
-            # Parse response
-            try:
-                questions_data = self._parse_quiz_response(gemini_response, current_week.topics)
-            except Exception as e:
-                error_trace = traceback.format_exc()
-                print(f"Parse error: {error_trace}")
-                print(f"Gemini response: {gemini_response[:1000] if gemini_response else 'None'}")
-                raise ValueError(f"Failed to parse dynamic quiz response: {str(e)}")
-
-            # Create quiz
-            quiz = WeeklyQuiz(
-                id=f"quiz_{course_id}_week{week_number}_dynamic_{student_id}_{uuid.uuid4().hex[:8]}",
-                courseId=course_id,
-                weekNumber=week_number,
-                quizType="dynamic",
-                title=f"Week {week_number} Dynamic Quiz",
-                description=f"Personalized quiz targeting your weak areas from Week {week_number}",
-                questions=questions_data,
-                topicIds=[topic.id for topic in current_week.topics],
-                createdAt=datetime.utcnow().isoformat() + "Z",
-                maxScore=len(questions_data)
+            return await asyncio.to_thread(
+                self._save_dynamic_quiz, course_id, week_number, student_id, current_week, gemini_response
             )
-
-            # Save quiz
-            self.storage.save_quiz(quiz)
-
-            return quiz
-        except ValueError:
-            # Re-raise ValueError as-is
+        except (ValueError, GeminiBusyError):
             raise
         except Exception as e:
             error_trace = traceback.format_exc()
             print(f"Unexpected error in generate_dynamic_quiz: {error_trace}")
             raise ValueError(f"Unexpected error generating dynamic quiz: {str(e)}")
 
+    def _dynamic_quiz_focus(
+        self,
+        course_id: str,
+        week_number: int,
+        student_id: str
+    ) -> Tuple[Week, List[str]]:
+        """
+        Look up a week and the student's weak areas among its topics.
+        
+        Returns:
+            (week, topic IDs to focus on)
+        """
+        current_week = self._find_week(course_id, week_number)
+
+        # Get student's weaknesses
+        performance = self.performance_storage.get_student_performance(student_id, course_id)
+        weaknesses = performance.weaknesses if performance else []
+
+        # Filter weaknesses to only include topics from current week
+        current_week_topic_ids = [topic.id for topic in current_week.topics]
+        relevant_weaknesses = [w for w in weaknesses if w in current_week_topic_ids]
+
+        # If no relevant weaknesses found, use all topics from current week as focus areas
+        # This can happen if student hasn't taken quizzes for this week yet
+        if not relevant_weaknesses:
+            # Use all current week topics as focus areas for the dynamic quiz
+            relevant_weaknesses = current_week_topic_ids
+
+        if not current_week.topics:
+            raise ValueError(f"No topics found for week {week_number}")
+        return current_week, relevant_weaknesses
+
+    def _save_dynamic_quiz(
+        self,
+        course_id: str,
+        week_number: int,
+        student_id: str,
+        current_week: Week,
+        gemini_response: str
+    ) -> WeeklyQuiz:
+        """Parse Gemini's dynamic quiz response and persist the quiz."""
+        # Parse response
+        try:
+            questions_data = self._parse_quiz_response(gemini_response, current_week.topics)
+        except Exception as e:
+            error_trace = traceback.format_exc()
+            print(f"Parse error: {error_trace}")
+            print(f"Gemini response: {gemini_response[:1000] if gemini_response else 'None'}")
+            raise ValueError(f"Failed to parse dynamic quiz response: {str(e)}")
+
+        # Create quiz
+        quiz = WeeklyQuiz(
+            id=f"quiz_{course_id}_week{week_number}_dynamic_{student_id}_{uuid.uuid4().hex[:8]}",
+            courseId=course_id,
+            weekNumber=week_number,
+            quizType="dynamic",
+            title=f"Week {week_number} Dynamic Quiz",
+            description=f"Personalized quiz targeting your weak areas from Week {week_number}",
+            questions=questions_data,
+            topicIds=[topic.id for topic in current_week.topics],
+            createdAt=datetime.utcnow().isoformat() + "Z",
+            maxScore=len(questions_data)
+        )
+
+        # Save quiz
+        self.storage.save_quiz(quiz)
+
+        return quiz
+
     def submit_quiz(
         self,
         request: QuizSubmissionRequest
@@ -321,12 +523,14 @@ class QuizService:
         # Save attempt
         self.storage.save_attempt(attempt)
 
-        # Update student strengths/weaknesses
+        # Update student strengths/weaknesses from this request's view of the
+        # attempts so the log is only read once per submission
         self.performance_storage.update_student_performance(
             request.studentId,
             request.courseId,
             attempt,
-            analysis
+            analysis,
+            attempts=self.storage.get_course_attempt_rows(request.studentId, request.courseId)
         )
 
         return QuizSubmissionResponse(
@@ -454,8 +658,8 @@ class QuizService:
             raise ValueError(f"Could not extract JSON from Gemini response: {str(e)}\nResponse: {response_text[:500]}")
         
         try:
-            data = json.loads(json_str)
-        except json.JSONDecodeError as e:
+            data = orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in Gemini response: {str(e)}\nJSON string: {json_str[:500]}")
 
         # Validate that questions exist
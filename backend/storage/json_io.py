@@ -0,0 +1,31 @@
+"""Shared JSON file writing for the storage layer."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from config import settings
+
+
+def write_json_atomic(filepath: Path, data: Any) -> None:
+    """
+    Write ``data`` as JSON to ``filepath`` without ever leaving a partial file.
+
+    The payload is encoded in one go, written to a sibling ``.tmp`` file and
+    moved into place with ``os.replace``. Output is compact unless the
+    ``pretty_json`` setting is enabled.
+
+    Args:
+        filepath: Destination file
+        data: JSON-serializable value
+    """
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 if settings.pretty_json else 0)
+
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp = filepath.with_suffix(filepath.suffix + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(payload)
+    os.replace(tmp, filepath)
@@ -1,14 +1,388 @@
 """Persistent storage helpers for weekly quiz data."""
 from __future__ import annotations
 
-import json
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from urllib.parse import quote
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process locks apply
+    fcntl = None
+
+from config import settings
+from storage.json_io import write_json_atomic
 from models import WeeklyQuiz, WeeklyQuizAttempt
 
 
+# Quizzes keyed by "courseId|weekNumber|quizType" (snapshot layout, with
+# newer rows from the append log applied on top), built once per file version
+_QuizIndex = Dict[str, Dict[str, Any]]
+
+_StatKey = Tuple[str, int, int, int]
+
+
+def _stat_key(filepath: Path) -> Optional[_StatKey]:
+    """Return the (path, mtime_ns, size, inode) cache key for a file, or None if missing."""
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    # Writers swap files in with os.replace, so a new inode catches rewrites
+    # that keep the size within the filesystem's mtime granularity
+    return str(filepath), st.st_mtime_ns, st.st_size, st.st_ino
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path_str: str, mtime_ns: int, size: int, inode: int) -> Any:
+    """
+    Parse a JSON storage file, memoized on its stat signature.
+
+    Any write bumps mtime/size or swaps the inode, so stale entries simply stop being hit and
+    age out of the (deliberately small) cache. Callers must treat the
+    returned value as read-only since it is shared between calls.
+    """
+    with open(path_str, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def quiz_key(course_id: str, week_number: int, quiz_type: str) -> str:
+    """Key of a quiz in the quizzes file."""
+    return f"{course_id}|{week_number}|{quiz_type}"
+
+
+def _quizzes_by_key(data: Any) -> Dict[str, Dict[str, Any]]:
+    """Return quizzes keyed by ``quiz_key``, accepting the legacy list layout too."""
+    if isinstance(data, dict):
+        return data
+    by_key: Dict[str, Dict[str, Any]] = {}
+    for row in data:
+        by_key.setdefault(quiz_key(row.get("courseId"), row.get("weekNumber"), row.get("quizType")), row)
+    return by_key
+
+
+@lru_cache(maxsize=2)
+def _quiz_index(
+    snapshot_key: Optional[_StatKey],
+    *log_keys: Optional[_StatKey]
+) -> _QuizIndex:
+    """
+    Build the quiz index for one version of the quizzes snapshot and logs.
+
+    Log files are applied oldest first and later rows replace earlier ones
+    with the same key. A file that disappears mid-read (removed by a
+    finished compaction, which already folded it into the snapshot) is
+    treated as empty.
+    """
+    by_key: Dict[str, Dict[str, Any]] = {}
+    if snapshot_key:
+        try:
+            by_key.update(_quizzes_by_key(_load_cached(*snapshot_key)))
+        except FileNotFoundError:
+            pass
+    for log_key in log_keys:
+        if not log_key:
+            continue
+        try:
+            with open(log_key[0], "rb") as f:
+                for line in f:
+                    if line.strip():
+                        row = orjson.loads(line)
+                        by_key[quiz_key(row.get("courseId"), row.get("weekNumber"), row.get("quizType"))] = row
+        except FileNotFoundError:
+            pass
+    return by_key
+
+
+def _candidate_lines(path_str: str, fields: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    Yield raw lines of a JSON-Lines file that may have the given field values.
+
+    Each line is checked for the JSON-encoded values as raw bytes, which
+    rejects almost every irrelevant record without decoding it. Callers
+    must confirm the fields after parsing since a substring hit can be a
+    false positive.
+    """
+    needles = [orjson.dumps(value) for value in fields.values()]
+    with open(path_str, "rb") as f:
+        for line in f:
+            if line.strip() and all(needle in line for needle in needles):
+                yield line
+
+
+def _scan_attempt_lines(path_str: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """Yield attempt rows from a JSON-Lines file whose fields equal ``fields``."""
+    for line in _candidate_lines(path_str, fields):
+        row = orjson.loads(line)
+        if all(row.get(name) == value for name, value in fields.items()):
+            yield row
+
+
+def _scan_attempt_models(path_str: str, **fields: Any) -> Iterator[WeeklyQuizAttempt]:
+    """
+    Like ``_scan_attempt_lines`` but validates each candidate line straight
+    from bytes into a ``WeeklyQuizAttempt``, skipping the intermediate dict.
+    """
+    for line in _candidate_lines(path_str, fields):
+        attempt = WeeklyQuizAttempt.model_validate_json(line)
+        if all(getattr(attempt, name) == value for name, value in fields.items()):
+            yield attempt
+
+
+@lru_cache(maxsize=32)
+def _attempt_rows(path_str: str, mtime_ns: int, size: int, inode: int) -> List[Dict[str, Any]]:
+    """Parse one version of a student's attempts file (shared; treat as read-only)."""
+    return list(_scan_attempt_lines(path_str))
+
+
+_EMPTY_QUIZ_INDEX: _QuizIndex = {}
+
+
+class _AttemptWriteBuffer:
+    """
+    Coalesces appended attempt lines into one write per batch.
+
+    A batch is written when it reaches ``batch_size`` lines or when the
+    flush timer fires, whichever comes first. Readers flush before loading
+    so a student always sees their own submission, but only within this
+    process: other workers see buffered lines once they are flushed, and a
+    crash loses them. Lines added with ``durable=True`` are therefore
+    written and fsynced, together with anything queued before them,
+    before ``add`` returns.
+    """
+
+    def __init__(self, filepath: Path, batch_size: int, flush_interval: float) -> None:
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, line: str, durable: bool = False) -> None:
+        with self._lock:
+            self._lines.append(line)
+            if durable:
+                self._flush_locked(sync=True)
+            elif len(self._lines) >= self.batch_size:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self, sync: bool = False) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._lines:
+            return
+        pending, self._lines = self._lines, []
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        with self.filepath.open("a", encoding="utf-8") as f:
+            f.write("".join(pending))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+_write_buffers: Dict[str, _AttemptWriteBuffer] = {}
+_write_buffers_lock = threading.Lock()
+
+
+@atexit.register
+def _flush_all_write_buffers() -> None:
+    """Write every buffered attempt, e.g. on shutdown."""
+    with _write_buffers_lock:
+        buffers = list(_write_buffers.values())
+    for buffer in buffers:
+        buffer.flush()
+
+
+def _attempt_write_buffer(filepath: Path) -> _AttemptWriteBuffer:
+    """Return the process-wide write buffer for an attempts file."""
+    with _write_buffers_lock:
+        buffer = _write_buffers.get(str(filepath))
+        if buffer is None:
+            buffer = _AttemptWriteBuffer(
+                filepath,
+                batch_size=max(1, settings.attempt_batch_size),
+                flush_interval=settings.attempt_flush_interval_ms / 1000,
+            )
+            _write_buffers[str(filepath)] = buffer
+        return buffer
+
+
+def attempts_dir(base_dir: Path) -> Path:
+    """Directory holding one JSON-Lines attempts file per student."""
+    return base_dir / "weekly_quiz_attempts"
+
+
+def attempt_file(base_dir: Path, student_id: str) -> Path:
+    """Path of a student's attempts file."""
+    return attempts_dir(base_dir) / f"{quote(student_id, safe='')}.jsonl"
+
+
+def quizzes_file(base_dir: Path) -> Path:
+    """Path of the shared quizzes snapshot."""
+    return base_dir / "weekly_quizzes" / "weekly_quizzes.json"
+
+
+def quizzes_log_file(base_dir: Path) -> Path:
+    """Path of the append-only log of quizzes saved since the last compaction."""
+    return base_dir / "weekly_quizzes" / "weekly_quizzes.log.jsonl"
+
+
+# Saves append to the log; once it outgrows the snapshot (and this floor)
+# a background thread folds it into a new snapshot.
+_QUIZ_LOG_COMPACT_MIN_BYTES = 64 * 1024
+
+# Serializes log appends with the compactor's rotation of the log, and
+# keeps a single compaction running at a time. Within a process these guard
+# the flock on the sidecar lock file, which does the same across workers.
+_quiz_log_lock = threading.Lock()
+_quiz_compaction_lock = threading.Lock()
+
+
+def _compacting_log_file(base_dir: Path) -> Path:
+    """Path the log is moved to while a compaction folds it into the snapshot."""
+    return base_dir / "weekly_quizzes" / "weekly_quizzes.log.compacting.jsonl"
+
+
+def _quiz_lock_file(base_dir: Path) -> Path:
+    """Path of the sidecar file worker processes flock around log writes."""
+    return base_dir / "weekly_quizzes" / "weekly_quizzes.lock"
+
+
+@contextmanager
+def _quiz_file_lock(base_dir: Path) -> Iterator[None]:
+    """Hold an exclusive flock on the quizzes lock file; a no-op without fcntl."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = _quiz_lock_file(base_dir)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _quiz_index_for(base_dir: Path) -> _QuizIndex:
+    """Return lookup tables for the current quizzes snapshot and logs."""
+    snapshot_key = _stat_key(quizzes_file(base_dir))
+    compacting_key = _stat_key(_compacting_log_file(base_dir))
+    log_key = _stat_key(quizzes_log_file(base_dir))
+    if not (snapshot_key or compacting_key or log_key):
+        return _EMPTY_QUIZ_INDEX
+    return _quiz_index(snapshot_key, compacting_key, log_key)
+
+
+def _needs_compact(base_dir: Path) -> bool:
+    """True once the quizzes log holds more bytes than the snapshot it patches."""
+    log_key = _stat_key(quizzes_log_file(base_dir))
+    if log_key is None:
+        return False
+    snapshot_key = _stat_key(quizzes_file(base_dir))
+    snapshot_size = snapshot_key[2] if snapshot_key else 0
+    return log_key[2] > max(snapshot_size, _QUIZ_LOG_COMPACT_MIN_BYTES)
+
+
+def compact_quizzes(base_dir: Path) -> int:
+    """
+    Fold the quizzes log into a fresh snapshot, keeping the latest row per key.
+
+    The log is moved aside and folded in while holding the log lock and the
+    flock, so no save in any worker can append to a log that has already
+    been read, and two workers never compact at once. Returns the number of
+    live quizzes written, or 0 if another compaction in this process is
+    already running.
+    """
+    if not _quiz_compaction_lock.acquire(blocking=False):
+        return 0
+    try:
+        log, compacting = quizzes_log_file(base_dir), _compacting_log_file(base_dir)
+        with _quiz_log_lock, _quiz_file_lock(base_dir):
+            # A leftover file from an interrupted compaction is folded in as is
+            if log.exists() and not compacting.exists():
+                os.replace(log, compacting)
+            index = _quiz_index(_stat_key(quizzes_file(base_dir)), _stat_key(compacting))
+            write_json_atomic(quizzes_file(base_dir), index)
+            compacting.unlink(missing_ok=True)
+        return len(index)
+    finally:
+        _quiz_compaction_lock.release()
+
+
+def migrate_legacy_quizzes(base_dir: Path) -> int:
+    """
+    Rewrite a quizzes file stored as a JSON array into the keyed object layout.
+
+    Returns:
+        Number of quizzes migrated
+    """
+    filepath = quizzes_file(base_dir)
+    if not filepath.exists():
+        return 0
+    with filepath.open("rb") as f:
+        data = orjson.loads(f.read())
+    if isinstance(data, dict):
+        return 0
+    by_key = _quizzes_by_key(data)
+    write_json_atomic(filepath, by_key)
+    return len(by_key)
+
+
+def migrate_legacy_attempts(base_dir: Path) -> int:
+    """
+    Split a single shared attempts file into per-student files.
+
+    Handles both the original JSON array (``weekly_quiz_attempts.json``) and
+    the shared JSON-Lines log (``weekly_quiz_attempts.jsonl``). The legacy
+    file is removed once its rows have been written.
+
+    Returns:
+        Number of attempts migrated
+    """
+    migrated = 0
+    for legacy in (
+        attempts_dir(base_dir) / "weekly_quiz_attempts.json",
+        attempts_dir(base_dir) / "weekly_quiz_attempts.jsonl",
+    ):
+        if not legacy.exists():
+            continue
+        with legacy.open("rb") as f:
+            if legacy.suffix == ".json":
+                attempts = orjson.loads(f.read())
+            else:
+                attempts = [orjson.loads(line) for line in f if line.strip()]
+
+        by_student: Dict[str, List[bytes]] = {}
+        for attempt_data in attempts:
+            line = orjson.dumps(attempt_data) + b"\n"
+            by_student.setdefault(attempt_data.get("studentId", ""), []).append(line)
+        for student_id, lines in by_student.items():
+            with attempt_file(base_dir, student_id).open("ab") as f:
+                f.write(b"".join(lines))
+
+        legacy.unlink()
+        migrated += len(attempts)
+    return migrated
+
+
 class QuizStorage:
     """Minimal JSON file storage for weekly quiz data."""
 
@@ -17,32 +391,24 @@ class QuizStorage:
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
     def _quizzes_file_path(self) -> Path:
-        return self.base_dir / "weekly_quizzes" / "weekly_quizzes.json"
+        return quizzes_file(self.base_dir)
 
-    def _attempts_file_path(self) -> Path:
-        return self.base_dir / "weekly_quiz_attempts" / "weekly_quiz_attempts.json"
+    def _attempt_file(self, student_id: str) -> Path:
+        return attempt_file(self.base_dir, student_id)
 
     def save_quiz(self, quiz: WeeklyQuiz) -> None:
         """Save a weekly quiz to storage."""
-        filepath = self._quizzes_file_path()
-        quizzes = self._load_quizzes()
-        
-        # Remove existing quiz of same type for this course/week if any
-        quizzes = [
-            q for q in quizzes 
-            if not (
-                q.get("courseId") == quiz.courseId and
-                q.get("weekNumber") == quiz.weekNumber and
-                q.get("quizType") == quiz.quizType
-            )
-        ]
-        
-        # Add new quiz
-        quizzes.append(quiz.model_dump())
-        
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with filepath.open("w", encoding="utf-8") as f:
-            json.dump(quizzes, f, ensure_ascii=False, indent=2)
+        # Append to the log; readers let it replace any earlier quiz of the
+        # same type for this course/week, and compaction drops the old row
+        line = quiz.model_dump_json() + "\n"
+        log = quizzes_log_file(self.base_dir)
+        log.parent.mkdir(parents=True, exist_ok=True)
+        with _quiz_log_lock, _quiz_file_lock(self.base_dir):
+            with log.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+        if _needs_compact(self.base_dir) and not _quiz_compaction_lock.locked():
+            threading.Thread(target=compact_quizzes, args=(self.base_dir,), daemon=True).start()
 
     def get_quiz(
         self,
@@ -51,76 +417,47 @@ class QuizStorage:
         quiz_type: str
     ) -> Optional[WeeklyQuiz]:
         """Retrieve a specific quiz by course, week, and type."""
-        quizzes = self._load_quizzes()
-        for quiz_data in quizzes:
-            if (
-                quiz_data.get("courseId") == course_id and
-                quiz_data.get("weekNumber") == week_number and
-                quiz_data.get("quizType") == quiz_type
-            ):
-                return WeeklyQuiz(**quiz_data)
-        return None
+        quiz_data = self._quizzes_index().get(quiz_key(course_id, week_number, quiz_type))
+        return WeeklyQuiz.model_validate(quiz_data) if quiz_data else None
 
-    def get_quizzes_for_week(
-        self,
-        course_id: str,
-        week_number: int
-    ) -> List[WeeklyQuiz]:
-        """Get all quizzes for a specific course and week."""
-        quizzes = self._load_quizzes()
-        result = []
-        for quiz_data in quizzes:
-            if (
-                quiz_data.get("courseId") == course_id and
-                quiz_data.get("weekNumber") == week_number
-            ):
-                result.append(WeeklyQuiz(**quiz_data))
-        return result
-
-    def _load_quizzes(self) -> List[Dict[str, Any]]:
-        """Load all quizzes from storage."""
-        filepath = self._quizzes_file_path()
-        if not filepath.exists():
-            return []
-        with filepath.open("r", encoding="utf-8") as f:
-            return json.load(f)
+    def _quizzes_index(self) -> _QuizIndex:
+        """Return the quiz index for the current quizzes snapshot and log."""
+        return _quiz_index_for(self.base_dir)
 
     def save_attempt(self, attempt: WeeklyQuizAttempt) -> None:
-        """Save a quiz attempt to storage."""
-        filepath = self._attempts_file_path()
-        attempts = self._load_attempts()
-        
-        # Add new attempt
-        attempts.append(attempt.model_dump())
-        
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with filepath.open("w", encoding="utf-8") as f:
-            json.dump(attempts, f, ensure_ascii=False, indent=2)
-
-    def get_attempts(
+        """Append a quiz attempt to its student's file (attempts are never rewritten)."""
+        # Serialized in one step by pydantic-core; no intermediate dict
+        line = attempt.model_dump_json() + "\n"
+        # Main-quiz attempts gate has_completed_main_quiz, which any worker
+        # may check, so they reach disk before returning; others are batched
+        _attempt_write_buffer(self._attempt_file(attempt.studentId)).add(
+            line, durable=attempt.quizType == "main"
+        )
+
+    def _flush_pending(self, student_id: Optional[str] = None) -> None:
+        """Write buffered attempts (one student's, or all) so they are visible to readers."""
+        if student_id is not None:
+            _attempt_write_buffer(self._attempt_file(student_id)).flush()
+        else:
+            _flush_all_write_buffers()
+
+    def get_course_attempt_rows(
         self,
         student_id: str,
-        course_id: str,
-        week_number: int
-    ) -> List[WeeklyQuizAttempt]:
-        """Get all quiz attempts for a student in a specific course and week."""
-        attempts = self._load_attempts()
-        result = []
-        for attempt_data in attempts:
-            if (
-                attempt_data.get("studentId") == student_id and
-                attempt_data.get("courseId") == course_id and
-                attempt_data.get("weekNumber") == week_number
-            ):
-                result.append(WeeklyQuizAttempt(**attempt_data))
-        return result
+        course_id: str
+    ) -> List[Dict[str, Any]]:
+        """Get raw attempt rows for a student across every week of a course."""
+        return [
+            attempt_data for attempt_data in self._cached_attempt_rows(student_id)
+            if attempt_data.get("courseId") == course_id
+        ]
 
     def get_attempt_by_id(self, attempt_id: str) -> Optional[WeeklyQuizAttempt]:
-        """Get a specific quiz attempt by ID."""
-        attempts = self._load_attempts()
-        for attempt_data in attempts:
-            if attempt_data.get("id") == attempt_id:
-                return WeeklyQuizAttempt(**attempt_data)
+        """Get a specific quiz attempt by ID (searches every student's file)."""
+        self._flush_pending()
+        for filepath in sorted(attempts_dir(self.base_dir).glob("*.jsonl")):
+            for attempt in _scan_attempt_models(str(filepath), id=attempt_id):
+                return attempt
         return None
 
     def has_completed_main_quiz(
@@ -130,16 +467,7 @@ class QuizStorage:
         week_number: int
     ) -> bool:
         """Check if student has completed the main quiz for a week."""
-        attempts = self._load_attempts()
-        for attempt_data in attempts:
-            if (
-                attempt_data.get("studentId") == student_id and
-                attempt_data.get("courseId") == course_id and
-                attempt_data.get("weekNumber") == week_number and
-                attempt_data.get("quizType") == "main"
-            ):
-                return True
-        return False
+        return self._first_attempt_row(student_id, course_id, week_number, "main") is not None
 
     def get_main_quiz_score(
         self,
@@ -148,58 +476,73 @@ class QuizStorage:
         week_number: int
     ) -> Optional[float]:
         """Get the main quiz score (percentage) for a student."""
-        attempts = self._load_attempts()
-        for attempt_data in attempts:
-            if (
-                attempt_data.get("studentId") == student_id and
-                attempt_data.get("courseId") == course_id and
-                attempt_data.get("weekNumber") == week_number and
-                attempt_data.get("quizType") == "main"
-            ):
-                return attempt_data.get("percentage")
-        return None
+        attempt_data = self._first_attempt_row(student_id, course_id, week_number, "main")
+        return attempt_data.get("percentage") if attempt_data else None
 
-    def get_main_quiz_attempt(
+    def has_completed_dynamic_quiz(
         self,
         student_id: str,
         course_id: str,
         week_number: int
-    ) -> Optional[WeeklyQuizAttempt]:
-        """Get the main quiz attempt for a student."""
-        attempts = self._load_attempts()
-        for attempt_data in attempts:
-            if (
-                attempt_data.get("studentId") == student_id and
-                attempt_data.get("courseId") == course_id and
-                attempt_data.get("weekNumber") == week_number and
-                attempt_data.get("quizType") == "main"
-            ):
-                return WeeklyQuizAttempt(**attempt_data)
-        return None
+    ) -> bool:
+        """Check if student has completed the dynamic quiz for a week."""
+        return self._first_attempt_row(student_id, course_id, week_number, "dynamic") is not None
 
-    def has_completed_dynamic_quiz(
+    def _first_attempt_row(
         self,
         student_id: str,
         course_id: str,
-        week_number: int
-    ) -> bool:
-        """Check if student has completed the dynamic quiz for a week."""
-        attempts = self._load_attempts()
-        for attempt_data in attempts:
-            if (
-                attempt_data.get("studentId") == student_id and
-                attempt_data.get("courseId") == course_id and
-                attempt_data.get("weekNumber") == week_number and
-                attempt_data.get("quizType") == "dynamic"
-            ):
-                return True
-        return False
+        week_number: int,
+        quiz_type: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the first raw attempt row for a student/course/week/type.
 
-    def _load_attempts(self) -> List[Dict[str, Any]]:
-        """Load all quiz attempts from storage."""
-        filepath = self._attempts_file_path()
+        The student's file is streamed and reading stops at the first match,
+        so a completed quiz usually costs a single parsed line rather than
+        loading and indexing the whole file.
+        """
+        self._flush_pending(student_id)
+        filepath = self._attempt_file(student_id)
         if not filepath.exists():
-            return []
-        with filepath.open("r", encoding="utf-8") as f:
-            return json.load(f)
+            return None
+        rows = _scan_attempt_lines(
+            str(filepath),
+            studentId=student_id,
+            courseId=course_id,
+            weekNumber=week_number,
+            quizType=quiz_type
+        )
+        return next(rows, None)
+
+    def _load_attempts(self) -> List[Dict[str, Any]]:
+        """Load every student's quiz attempts from storage."""
+        return list(self._iter_attempts_matching())
+
+    def _iter_attempts_matching(
+        self,
+        student_id: Optional[str] = None,
+        course_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream raw attempt rows for a student and/or course.
+
+        With a student only that student's file is read; otherwise every
+        student file is scanned. Rows for other courses are skipped before
+        they are parsed.
+        """
+        self._flush_pending(student_id)
+        if student_id is not None:
+            filepaths = [self._attempt_file(student_id)]
+        else:
+            filepaths = sorted(attempts_dir(self.base_dir).glob("*.jsonl"))
+        fields = {"courseId": course_id} if course_id is not None else {}
+        for filepath in filepaths:
+            if filepath.exists():
+                yield from _scan_attempt_lines(str(filepath), **fields)
 
+    def _cached_attempt_rows(self, student_id: str) -> List[Dict[str, Any]]:
+        """Return the rows of the current version of a student's attempts file."""
+        self._flush_pending(student_id)
+        key = _stat_key(self._attempt_file(student_id))
+        return _attempt_rows(*key) if key else []
@@ -1,30 +1,105 @@
 """Persistent storage helpers for student strength/weakness tracking."""
 from __future__ import annotations
 
-import json
+import os
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any
-from datetime import datetime
+from urllib.parse import quote
+from typing import Optional, Dict, Any, Iterable, TYPE_CHECKING
+
+import orjson
 
 from models import StudentStrengthWeakness, WeeklyQuizAttempt, QuizAnalysis
+from storage.json_io import write_json_atomic
+
+if TYPE_CHECKING:
+    from storage.quiz_storage import QuizStorage
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as ISO-8601 with a trailing Z, without building a datetime."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+@lru_cache(maxsize=256)
+def _load_performance(path_str: str, mtime_ns: int, size: int, inode: int) -> StudentStrengthWeakness:
+    """
+    Parse one performance record, memoized on the file's stat signature.
+
+    Saving swaps in a new file, which changes the inode as well as
+    mtime/size, so updated records are re-read automatically and stale
+    versions age out of the bounded cache. Callers must treat the returned model as read-only since it is
+    shared between calls.
+    """
+    with open(path_str, "rb") as f:
+        return StudentStrengthWeakness.model_validate_json(f.read())
+
+
+def performance_file(base_dir: Path, student_id: str, course_id: str) -> Path:
+    """Path of the performance record for one student in one course."""
+    # One directory per student: joining the quoted ids with a separator
+    # that quote() leaves alone (e.g. "_") would let two pairs collide
+    student_dir = base_dir / "student_performance" / quote(student_id, safe='')
+    return student_dir / f"{quote(course_id, safe='')}.json"
+
+
+def migrate_legacy_performance(base_dir: Path) -> int:
+    """
+    Move legacy performance records into per-student directories.
+
+    Handles both the shared ``student_performance.json`` list and the flat
+    ``<studentId>_<courseId>.json`` files, whose names can collide. Each
+    record's path is rebuilt from the ids stored inside it.
+
+    Returns:
+        Number of records migrated
+    """
+    performance_dir = base_dir / "student_performance"
+    migrated = 0
+    legacy = performance_dir / "student_performance.json"
+    if legacy.exists():
+        with legacy.open("rb") as f:
+            all_performance = orjson.loads(f.read())
+        for perf_data in all_performance:
+            filepath = performance_file(base_dir, perf_data["studentId"], perf_data["courseId"])
+            write_json_atomic(filepath, perf_data)
+        legacy.unlink()
+        migrated += len(all_performance)
+    if performance_dir.is_dir():
+        for flat in performance_dir.glob("*.json"):
+            with flat.open("rb") as f:
+                perf_data = orjson.loads(f.read())
+            filepath = performance_file(base_dir, perf_data["studentId"], perf_data["courseId"])
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(flat, filepath)
+            migrated += 1
+    return migrated
 
 
 class StrengthWeaknessStorage:
     """Storage for student performance tracking (strengths and weaknesses)."""
 
-    def __init__(self, base_dir: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        quiz_storage: Optional[QuizStorage] = None
+    ) -> None:
         self.base_dir = base_dir or Path(__file__).resolve().parent.parent / "database"
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        # Attempts are read through the caller's QuizStorage when one is shared
+        self.quiz_storage = quiz_storage
 
-    def _file_path(self) -> Path:
-        return self.base_dir / "student_performance" / "student_performance.json"
+    def _file_path(self, student_id: str, course_id: str) -> Path:
+        return performance_file(self.base_dir, student_id, course_id)
 
     def update_student_performance(
         self,
         student_id: str,
         course_id: str,
         quiz_attempt: WeeklyQuizAttempt,
-        analysis: QuizAnalysis
+        analysis: QuizAnalysis,
+        attempts: Optional[Iterable[Dict[str, Any]]] = None
     ) -> StudentStrengthWeakness:
         """
         Update student's strengths/weaknesses based on quiz performance.
@@ -35,55 +110,39 @@ class StrengthWeaknessStorage:
             course_id: Course identifier
             quiz_attempt: The quiz attempt that was just completed
             analysis: The performance analysis for this attempt
+            attempts: Raw attempt rows for this student/course, if the caller
+                already has them; loaded from quiz storage otherwise
             
         Returns:
             Updated StudentStrengthWeakness object
         """
         # Load all quiz attempts for this student/course to recalculate accurately
-        from storage.quiz_storage import QuizStorage
-        quiz_storage = QuizStorage()
-        
-        # Get all attempts for this course (across all weeks)
-        all_attempts = quiz_storage._load_attempts()
-        student_attempts = [
-            WeeklyQuizAttempt(**a) for a in all_attempts
-            if a.get("studentId") == student_id and a.get("courseId") == course_id
-        ]
-        
-        # Aggregate topic performance across all attempts
-        topic_stats: Dict[str, Dict[str, int]] = {}
-        
-        for attempt in student_attempts:
-            if attempt.analysis and attempt.analysis.topicBreakdown:
-                for topic_perf in attempt.analysis.topicBreakdown:
-                    topic_id = topic_perf.topicId
-                    
-                    if topic_id not in topic_stats:
-                        topic_stats[topic_id] = {
-                            "totalCorrect": 0,
-                            "totalAttempted": 0
-                        }
-                    
-                    topic_stats[topic_id]["totalCorrect"] += topic_perf.correctCount
-                    topic_stats[topic_id]["totalAttempted"] += topic_perf.questionsCount
+        if attempts is None:
+            if self.quiz_storage is None:
+                from storage.quiz_storage import QuizStorage
+                self.quiz_storage = QuizStorage()
+            attempts = self.quiz_storage._iter_attempts_matching(student_id, course_id)
+        
+        # Aggregate [correct, attempted] per topic straight from the raw rows;
+        # building WeeklyQuizAttempt models here would only cost allocations.
+        topic_stats: Dict[str, list[int]] = {}
+        
+        for a in attempts:
+            for topic_perf in (a.get("analysis") or {}).get("topicBreakdown") or ():
+                stats = topic_stats.get(topic_perf["topicId"])
+                if stats is None:
+                    stats = topic_stats[topic_perf["topicId"]] = [0, 0]
+                stats[0] += topic_perf["correctCount"]
+                stats[1] += topic_perf["questionsCount"]
         
         # Calculate percentages and classify strengths/weaknesses
-        strengths = []
-        weaknesses = []
-        topic_performance_percentages = {}
-        
-        for topic_id, stats in topic_stats.items():
-            total_correct = stats["totalCorrect"]
-            total_attempted = stats["totalAttempted"]
-            
-            if total_attempted > 0:
-                percentage = (total_correct / total_attempted) * 100
-                topic_performance_percentages[topic_id] = percentage
-                
-                if percentage > 75:
-                    strengths.append(topic_id)
-                elif percentage < 50:
-                    weaknesses.append(topic_id)
+        topic_performance_percentages = {
+            topic_id: (correct / attempted) * 100
+            for topic_id, (correct, attempted) in topic_stats.items()
+            if attempted > 0
+        }
+        strengths = [t for t, pct in topic_performance_percentages.items() if pct > 75]
+        weaknesses = [t for t, pct in topic_performance_percentages.items() if pct < 50]
         
         # Create or update performance object
         performance = StudentStrengthWeakness(
@@ -92,7 +151,7 @@ class StrengthWeaknessStorage:
             strengths=strengths,
             weaknesses=weaknesses,
             topicPerformance=topic_performance_percentages,
-            lastUpdated=datetime.utcnow().isoformat() + "Z"
+            lastUpdated=_utc_timestamp()
         )
         
         # Save updated performance
@@ -116,15 +175,13 @@ class StrengthWeaknessStorage:
         Returns:
             StudentStrengthWeakness object
         """
-        all_performance = self._load_all_performance()
-        
-        # Find existing performance
-        for perf_data in all_performance:
-            if (
-                perf_data.get("studentId") == student_id and
-                perf_data.get("courseId") == course_id
-            ):
-                return StudentStrengthWeakness(**perf_data)
+        filepath = self._file_path(student_id, course_id)
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            pass
+        else:
+            return _load_performance(str(filepath), st.st_mtime_ns, st.st_size, st.st_ino)
         
         # Create new performance entry if not found
         new_performance = StudentStrengthWeakness(
@@ -133,7 +190,7 @@ class StrengthWeaknessStorage:
             strengths=[],
             weaknesses=[],
             topicPerformance={},
-            lastUpdated=datetime.utcnow().isoformat() + "Z"
+            lastUpdated=_utc_timestamp()
         )
         
         # Save it
@@ -142,30 +199,6 @@ class StrengthWeaknessStorage:
         return new_performance
 
     def _save_performance(self, performance: StudentStrengthWeakness) -> None:
-        """Save or update a performance record."""
-        filepath = self._file_path()
-        all_performance = self._load_all_performance()
-        
-        # Remove existing entry for this student/course if any
-        all_performance = [
-            p for p in all_performance
-            if not (
-                p.get("studentId") == performance.studentId and
-                p.get("courseId") == performance.courseId
-            )
-        ]
-        
-        # Add updated entry
-        all_performance.append(performance.model_dump())
-        
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with filepath.open("w", encoding="utf-8") as f:
-            json.dump(all_performance, f, ensure_ascii=False, indent=2)
-
-    def _load_all_performance(self) -> list[Dict[str, Any]]:
-        """Load all performance records from storage."""
-        filepath = self._file_path()
-        if not filepath.exists():
-            return []
-        with filepath.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        """Save or replace the performance record for one student/course."""
+        filepath = self._file_path(performance.studentId, performance.courseId)
+        write_json_atomic(filepath, performance.model_dump())
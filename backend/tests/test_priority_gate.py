@@ -0,0 +1,92 @@
+"""Tests for priority admission to Gemini call slots."""
+import asyncio
+import unittest
+
+from utils.priority_gate import HIGH, LOW, GeminiBusyError, PriorityGate
+
+
+class PriorityGateTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.gate = PriorityGate(slots=1, max_waiting=2)
+        self.order: list = []
+        self.tasks: list = []
+
+    async def _occupy(self) -> asyncio.Event:
+        """Take the gate's only slot until the returned event is set."""
+        entered, done = asyncio.Event(), asyncio.Event()
+
+        async def hold() -> None:
+            async with self.gate.slot_async():
+                entered.set()
+                await done.wait()
+
+        self.tasks.append(asyncio.create_task(hold()))
+        await entered.wait()
+        return done
+
+    async def _queue(self, name: str, priority: int) -> asyncio.Task:
+        """Start a caller and let it queue for a slot."""
+        async def call() -> None:
+            async with self.gate.slot_async(priority):
+                self.order.append(name)
+
+        task = asyncio.create_task(call())
+        self.tasks.append(task)
+        await asyncio.sleep(0)
+        return task
+
+    async def test_high_priority_is_admitted_before_queued_low(self) -> None:
+        self.gate.max_waiting = 3
+        done = await self._occupy()
+        await self._queue("low 1", LOW)
+        await self._queue("low 2", LOW)
+        await self._queue("high", HIGH)
+
+        done.set()
+        await asyncio.gather(*self.tasks)
+
+        self.assertEqual(self.order, ["high", "low 1", "low 2"])
+
+    async def test_full_queue_rejects_new_callers(self) -> None:
+        done = await self._occupy()
+        await self._queue("a", HIGH)
+        await self._queue("b", HIGH)
+
+        with self.assertRaises(GeminiBusyError):
+            async with self.gate.slot_async():
+                pass
+
+        done.set()
+        await asyncio.gather(*self.tasks)
+        self.assertEqual(self.order, ["a", "b"])
+
+    async def test_cancelled_waiter_is_skipped_and_frees_its_place(self) -> None:
+        done = await self._occupy()
+        cancelled = await self._queue("cancelled", HIGH)
+        await self._queue("a", LOW)
+
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        # Its place in the queue is free again
+        await self._queue("b", LOW)
+
+        done.set()
+        await asyncio.gather(*[task for task in self.tasks if task is not cancelled])
+        self.assertEqual(self.order, ["a", "b"])
+        self.assertEqual(self.gate._in_use, 0)
+
+    async def test_cancelled_last_waiter_leaves_free_slot_usable(self) -> None:
+        done = await self._occupy()
+        cancelled = await self._queue("cancelled", HIGH)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        done.set()
+        await asyncio.gather(*[task for task in self.tasks if task is not cancelled])
+
+        await asyncio.wait_for(self._queue("a", HIGH), timeout=1)
+        await asyncio.gather(*self.tasks[-1:])
+        self.assertEqual(self.order, ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""Tests for weekly quiz and quiz attempt storage."""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+import orjson
+
+from models import WeeklyQuiz, WeeklyQuizAttempt
+from storage.json_io import write_json_atomic
+from storage.quiz_storage import (
+    QuizStorage,
+    attempt_file,
+    compact_quizzes,
+    quizzes_file,
+    quizzes_log_file
+)
+
+
+def _quiz(quiz_id: str, week_number: int, quiz_type: str = "main") -> WeeklyQuiz:
+    return WeeklyQuiz(
+        id=quiz_id,
+        courseId="cs101",
+        weekNumber=week_number,
+        quizType=quiz_type,
+        title=f"Quiz {quiz_id}",
+        createdAt="2024-01-01T00:00:00Z",
+        maxScore=0
+    )
+
+
+def _attempt(attempt_id: str, quiz_type: str, week_number: int = 1, percentage: float = 80.0) -> WeeklyQuizAttempt:
+    return WeeklyQuizAttempt(
+        id=attempt_id,
+        studentId="stu_1",
+        courseId="cs101",
+        weekNumber=week_number,
+        quizId=f"quiz_{quiz_type}",
+        quizType=quiz_type,
+        answers={"q1": 0},
+        score=percentage / 100,
+        maxScore=1.0,
+        percentage=percentage,
+        completedAt="2024-01-01T00:00:00Z"
+    )
+
+
+class AttemptStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = Path(tempfile.mkdtemp())
+        self.storage = QuizStorage(self.base_dir)
+
+    def _lines_on_disk(self) -> list:
+        filepath = attempt_file(self.base_dir, "stu_1")
+        if not filepath.exists():
+            return []
+        return [line for line in filepath.read_text(encoding="utf-8").splitlines() if line]
+
+    def test_main_attempt_is_on_disk_when_saved(self) -> None:
+        self.storage.save_attempt(_attempt("a1", "main", percentage=90.0))
+
+        self.assertEqual(len(self._lines_on_disk()), 1)
+        self.assertTrue(self.storage.has_completed_main_quiz("stu_1", "cs101", 1))
+        self.assertEqual(self.storage.get_main_quiz_score("stu_1", "cs101", 1), 90.0)
+        self.assertFalse(self.storage.has_completed_main_quiz("stu_1", "cs101", 2))
+
+    def test_buffered_attempts_are_visible_to_readers(self) -> None:
+        self.storage.save_attempt(_attempt("a1", "refresher"))
+        self.storage.save_attempt(_attempt("a2", "dynamic"))
+
+        self.assertTrue(self.storage.has_completed_dynamic_quiz("stu_1", "cs101", 1))
+        self.assertEqual(self.storage.get_attempt_by_id("a1"), _attempt("a1", "refresher"))
+        rows = self.storage.get_course_attempt_rows("stu_1", "cs101")
+        self.assertEqual([row["id"] for row in rows], ["a1", "a2"])
+        self.assertEqual(len(self._lines_on_disk()), 2)
+
+    def test_main_attempt_writes_earlier_buffered_attempts(self) -> None:
+        self.storage.save_attempt(_attempt("a1", "refresher"))
+        self.storage.save_attempt(_attempt("a2", "main"))
+
+        self.assertEqual(
+            [line[:11] for line in self._lines_on_disk()],
+            ['{"id":"a1",', '{"id":"a2",']
+        )
+
+
+class QuizCompactionTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = Path(tempfile.mkdtemp())
+        self.storage = QuizStorage(self.base_dir)
+
+    def test_compaction_keeps_latest_quiz_per_key(self) -> None:
+        self.storage.save_quiz(_quiz("old", 1))
+        self.storage.save_quiz(_quiz("refresher", 1, "refresher"))
+        self.storage.save_quiz(_quiz("new", 1))
+        self.storage.save_quiz(_quiz("week2", 2))
+
+        self.assertEqual(compact_quizzes(self.base_dir), 3)
+
+        self.assertFalse(quizzes_log_file(self.base_dir).exists())
+        snapshot = orjson.loads(quizzes_file(self.base_dir).read_bytes())
+        self.assertEqual(
+            {key: row["id"] for key, row in snapshot.items()},
+            {"cs101|1|main": "new", "cs101|1|refresher": "refresher", "cs101|2|main": "week2"}
+        )
+        self.assertEqual(self.storage.get_quiz("cs101", 1, "main").id, "new")
+
+    def test_saves_after_compaction_replace_snapshot_rows(self) -> None:
+        self.storage.save_quiz(_quiz("old", 1))
+        compact_quizzes(self.base_dir)
+
+        self.storage.save_quiz(_quiz("new", 1))
+
+        self.assertEqual(self.storage.get_quiz("cs101", 1, "main").id, "new")
+        compact_quizzes(self.base_dir)
+        self.assertEqual(self.storage.get_quiz("cs101", 1, "main").id, "new")
+
+
+class QuizCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = Path(tempfile.mkdtemp())
+        self.storage = QuizStorage(self.base_dir)
+
+    def test_snapshot_replaced_externally_is_reread(self) -> None:
+        snapshot = quizzes_file(self.base_dir)
+        write_json_atomic(snapshot, {"cs101|1|main": _quiz("aaa", 1).model_dump()})
+        self.assertEqual(self.storage.get_quiz("cs101", 1, "main").id, "aaa")
+        before = os.stat(snapshot)
+
+        # Same size and mtime, as when another worker rewrites the file
+        # within the filesystem's timestamp granularity
+        write_json_atomic(snapshot, {"cs101|1|main": _quiz("bbb", 1).model_dump()})
+        os.utime(snapshot, ns=(before.st_atime_ns, before.st_mtime_ns))
+        self.assertEqual(os.stat(snapshot).st_size, before.st_size)
+
+        self.assertEqual(self.storage.get_quiz("cs101", 1, "main").id, "bbb")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Tests for token-bucket rate limiting."""
+import unittest
+
+from utils.rate_limiter import TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # One token per second
+        self.bucket = TokenBucket(capacity=60, period=60)
+
+    def test_full_bucket_does_not_wait(self) -> None:
+        self.assertEqual(self.bucket._reserve(60), 0.0)
+
+    def test_deficit_waits_for_its_refill(self) -> None:
+        self.bucket._reserve(60)
+        self.assertAlmostEqual(self.bucket._reserve(2), 2.0, places=2)
+        self.assertAlmostEqual(self.bucket._reserve(1), 3.0, places=2)
+
+    def test_tokens_refill_over_time_up_to_capacity(self) -> None:
+        self.bucket._reserve(60)
+        self.bucket._updated -= 30
+        self.assertEqual(self.bucket._reserve(30), 0.0)
+
+        self.bucket._updated -= 1000
+        self.assertEqual(self.bucket._reserve(60), 0.0)
+        self.assertAlmostEqual(self.bucket._reserve(1), 1.0, places=2)
+
+    def test_oversized_request_uses_at_most_the_whole_bucket(self) -> None:
+        self.assertEqual(self.bucket._reserve(500), 0.0)
+        self.assertAlmostEqual(self.bucket._reserve(1), 1.0, places=2)
+
+    def test_zero_capacity_disables_limiting(self) -> None:
+        bucket = TokenBucket(capacity=0)
+        self.assertEqual(bucket._reserve(1000), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
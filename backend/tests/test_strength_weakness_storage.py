@@ -0,0 +1,68 @@
+"""Tests for per-student performance record storage."""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+from models import StudentStrengthWeakness
+from storage.json_io import write_json_atomic
+from storage.strength_weakness_storage import (
+    StrengthWeaknessStorage,
+    migrate_legacy_performance,
+    performance_file
+)
+
+
+def _performance(student_id: str, course_id: str, strengths: list) -> StudentStrengthWeakness:
+    return StudentStrengthWeakness(
+        studentId=student_id,
+        courseId=course_id,
+        strengths=strengths,
+        weaknesses=[],
+        topicPerformance={},
+        lastUpdated="2024-01-01T00:00:00Z"
+    )
+
+
+class PerformanceFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir = Path(tempfile.mkdtemp())
+        self.storage = StrengthWeaknessStorage(self.base_dir)
+
+    def test_ids_containing_underscores_do_not_collide(self) -> None:
+        self.assertNotEqual(
+            performance_file(self.base_dir, "a_b", "c"),
+            performance_file(self.base_dir, "a", "b_c")
+        )
+
+        self.storage._save_performance(_performance("a_b", "c", ["first"]))
+        self.storage._save_performance(_performance("a", "b_c", ["second"]))
+
+        self.assertEqual(self.storage.get_student_performance("a_b", "c").strengths, ["first"])
+        self.assertEqual(self.storage.get_student_performance("a", "b_c").strengths, ["second"])
+
+    def test_flat_legacy_files_are_moved_per_student(self) -> None:
+        legacy = self.base_dir / "student_performance" / "a_b_c.json"
+        write_json_atomic(legacy, _performance("a_b", "c", ["legacy"]).model_dump())
+
+        self.assertEqual(migrate_legacy_performance(self.base_dir), 1)
+
+        self.assertFalse(legacy.exists())
+        self.assertEqual(self.storage.get_student_performance("a_b", "c").strengths, ["legacy"])
+
+    def test_record_replaced_externally_is_reread(self) -> None:
+        filepath = performance_file(self.base_dir, "a", "c")
+        write_json_atomic(filepath, _performance("a", "c", ["aaa"]).model_dump())
+        self.assertEqual(self.storage.get_student_performance("a", "c").strengths, ["aaa"])
+        before = os.stat(filepath)
+
+        write_json_atomic(filepath, _performance("a", "c", ["bbb"]).model_dump())
+        os.utime(filepath, ns=(before.st_atime_ns, before.st_mtime_ns))
+
+        self.assertEqual(self.storage.get_student_performance("a", "c").strengths, ["bbb"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,47 +1,605 @@
 """
 Google Gemini API client wrapper.
 """
+import asyncio
+import logging
+from contextlib import aclosing
+from functools import lru_cache
+from pathlib import Path
+
 import google.generativeai as genai
-from google.api_core.exceptions import NotFound
+from google.generativeai import client as genai_client
+from google.api_core import retry as api_retry, retry_async
+from google.api_core.exceptions import (
+    InternalServerError,
+    NotFound,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
 from config import settings
-from typing import List, Dict, Any, Optional
+from models import Resource, Topic
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional, Tuple
+from utils.rate_limiter import TokenBucket
+from utils.response_cache import ResponseCache
+from utils.semantic_cache import SemanticCache
+from utils.priority_gate import PriorityGate, HIGH, LOW
+from utils.response_schemas import (
+    CurriculumSchema,
+    LessonNotesSchema,
+    PretestSchema,
+    RecommendationSchema,
+    QuizSchema,
+)
+
+
+# Relative cache paths in settings are resolved against the backend directory
+_BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_RESOURCES_HEADER = "\nInclude relevant resources such as:"
+_STUDY_MATERIALS_LINE = "\n- Study materials (documentation, tutorials, books)"
+_MEDIA_LINKS_LINE = "\n- Media links (YouTube videos, online courses, podcasts)"
+
+# (include_study_materials, include_media_links) -> resources block of the curriculum prompt
+_CURRICULUM_RESOURCES_INSTRUCTIONS = {
+    (False, False): "",
+    (True, False): _RESOURCES_HEADER + _STUDY_MATERIALS_LINE,
+    (False, True): _RESOURCES_HEADER + _MEDIA_LINKS_LINE,
+    (True, True): _RESOURCES_HEADER + _STUDY_MATERIALS_LINE + _MEDIA_LINKS_LINE,
+}
+
+# Prompts put the static instructions first and the request-specific
+# inputs last, so every request shares the same long prefix
+# (which Gemini can serve from its implicit prefix cache).
+_CURRICULUM_PROMPT_PREFIX = """You are a curriculum design expert. Given a rough course outline, expand it into a comprehensive curriculum.
+
+Requirements:
+- Create a curriculum for exactly the number of weeks given below
+- Each week should have a clear title and 3-5 topics
+- Each topic should have: id (format: "topic_[week]_[number]"), title, and a detailed description
+- For each resource, specify the type: "article" (links to read), "video" (videos to watch), "pdf" (PDF documents), or "course" (online courses)
+- Follow the provided response schema
+"""
+
+_CURRICULUM_PROMPT_SUFFIX = """
+Number of weeks: {number_of_weeks}
+{resources_instruction}
+
+Rough Outline:
+{content}
+
+Generate the comprehensive curriculum now:"""
+
+_LESSON_NOTES_PROMPT_PREFIX = """You are an expert educator creating detailed lesson notes for a topic. Generate comprehensive lesson notes that will help teachers deliver an effective lesson.
+
+Create detailed lesson notes for the topic given below with the following structure:
+1. **Introduction** - Brief overview and learning objectives
+2. **Detailed Explanation** - Core concepts and key points explained thoroughly
+3. **Practical Examples** - 2-3 concrete examples demonstrating the concepts
+4. **Learning Activities** - 2-3 hands-on activities or exercises for student engagement
+5. **Summary** - Key takeaways and recap
+
+Requirements:
+- Make content clear, engaging, and appropriate for teaching
+- Include specific examples that illustrate the concepts
+- Provide activities that promote active learning and understanding
+- Estimate the total lesson duration
+- Follow the provided response schema
+"""
+
+_LESSON_NOTES_PROMPT_SUFFIX = """
+Topic: {topic_title}
+
+Description: {topic_description}
+{resources_context}
+
+Generate the detailed lesson notes now:"""
+
+# Sections of a pretest generated concurrently (see PretestService)
+_PREREQUISITE_QUESTIONS_PROMPT_PREFIX = """You are an expert test creator. Generate the prerequisite section of a SHORT pretest that assesses students' readiness for the course whose topics are listed below.
+
+Requirements:
+- Generate between 5 and 12 multiple choice questions - DO NOT EXCEED 12
+- Each question must have exactly 4 options (A, B, C, D)
+- Ask ONLY about prerequisite knowledge students should have BEFORE starting this course, not about the course topics themselves
+- Mix easy, medium, and challenging questions
+- For each question, specify the course topic it is a prerequisite for (use the topic ID)
+- Follow the provided response schema
+"""
+
+_PREREQUISITE_QUESTIONS_PROMPT_SUFFIX = """
+Course Topics:
+{topics_text}
+
+Generate the prerequisite questions now:"""
+
+_TOPIC_QUESTIONS_PROMPT_PREFIX = """You are an expert test creator. Generate pretest questions that gauge whether students are ready to start learning the single course topic given below.
+
+Requirements:
+- Generate exactly the number of questions given below
+- Each question must have exactly 4 options (A, B, C, D)
+- Questions should be answerable by a student who has not yet taken the course but has the expected background
+- Use the Topic ID and Topic given below as topicId and topicTitle
+- Follow the provided response schema
+"""
+
+_TOPIC_QUESTIONS_PROMPT_SUFFIX = """
+Number of questions: {question_count}
+Topic ID: {topic_id}
+Topic: {topic_title}
+Description: {topic_description}
+
+Generate the questions now:"""
+
+_RECOMMENDATION_PROMPT_PREFIX = """You are an educational advisor. A student needs help with a specific topic they struggled with on a pretest; the topic is given below.
+
+Generate ONE targeted learning resource recommendation:
+- Provide a specific, high-quality online resource (article, video, course, or PDF)
+- The resource should be appropriate for someone learning this topic from scratch or needing reinforcement
+- Include a brief explanation of why this resource will help
+- Use the Topic ID and Topic given below as topicId and topicTitle
+- Follow the provided response schema
+"""
+
+_RECOMMENDATION_PROMPT_SUFFIX = """
+Topic ID: {topic_id}
+Topic: {topic_title}
+Description: {topic_description}
+Student Performance: {student_performance}
+
+Generate the recommendation now:"""
+
+_MAIN_QUIZ_PROMPT_PREFIX = """You are an expert quiz creator. Generate a main quiz for the course week given below.
+
+Requirements:
+- Generate exactly 8 questions on the current week's topics
+- Maximum 10 questions total (8 current week + 1-2 bonus from previous week)
+- Each question must have exactly 4 multiple choice options
+- Questions should test understanding of what students have learned this week
+- Mix of difficulty levels (easy, medium, hard)
+- For each question, specify the topicId it relates to
+- Bonus questions should be marked with isBonus: true
+- Follow the provided response schema
+"""
+
+_MAIN_QUIZ_PROMPT_SUFFIX = """
+Week: {week_number}
+
+Current Week Topics:
+{current_topics_text}
+{bonus_instruction}
+
+Generate the main quiz questions now:"""
+
+_MAIN_QUIZ_BONUS_INSTRUCTION = """
+- Include 1-2 bonus questions from the previous week's topics (these should be marked with isBonus: true)
+Previous Week Topics:
+{previous_topics_text}"""
+
+_REFRESHER_QUIZ_PROMPT_PREFIX = """You are an expert quiz creator. Generate a refresher quiz for the course week given below.
+
+Requirements:
+- Generate exactly 10 questions solely on this week's topics
+- Each question must have exactly 4 multiple choice options
+- Questions should test understanding of the week's concepts but from different angles than previous quizzes
+- Vary the question types and approaches while covering the same concepts
+- Mix of difficulty levels (easy, medium, hard)
+- For each question, specify the topicId it relates to
+- No bonus questions (isBonus should always be false)
+- Follow the provided response schema
+"""
+
+_REFRESHER_QUIZ_PROMPT_SUFFIX = """
+Week: {week_number}
+
+Week Topics:
+{topics_text}
+
+Generate fresh refresher quiz questions now (different from any previous quizzes but covering the same concepts):"""
+
+_DYNAMIC_QUIZ_PROMPT_PREFIX = """You are an expert quiz creator. Generate a dynamic quiz for the course week given below to help a student improve.
+
+Requirements:
+- Generate exactly 10 questions from this week's topics
+- Follow the focus given below
+- Adaptive difficulty - start with foundational concepts, then build up
+- Each question must have exactly 4 multiple choice options
+- For each question, specify the topicId it relates to
+- Questions should help identify and correct misunderstandings
+- Follow the provided response schema
+"""
+
+_DYNAMIC_QUIZ_PROMPT_SUFFIX = """
+Week: {week_number}
+
+Week Topics:
+{topics_text}
+
+Student's Weak Areas (Topic IDs): {weaknesses_text}
+
+Focus:
+{focus_instruction}
+
+Generate the dynamic quiz questions targeting the student's weak areas:"""
+
+_DYNAMIC_QUIZ_WEAKNESS_FOCUS = "- Focus on topics where the student struggled (topic IDs: {weaknesses_text})\n- Questions should address common misconceptions and reinforce understanding"
+_DYNAMIC_QUIZ_GENERAL_FOCUS = "- Focus on all topics from this week to provide comprehensive practice\n- Questions should cover foundational concepts and common areas where students typically struggle"
+
+logger = logging.getLogger(__name__)
+
+# Transient Gemini errors (429 quota, 500, 503) worth retrying with backoff
+_RETRYABLE = api_retry.if_exception_type(ResourceExhausted, ServiceUnavailable, InternalServerError)
+
+# Output token caps per call type, so a runaway response cannot dominate
+# latency or cost. Questions are capped per question and curricula per week;
+# a curriculum week holds 3-5 topics with descriptions and resources, which
+# takes about 800 tokens of JSON.
+_MAX_OUTPUT_TOKENS = {
+    "recommendation": 400,
+    "question": 300,
+    "lesson_notes": 4000,
+    "curriculum_week": 800,
+    "curriculum_min": 1500,
+}
+
+# Added to every cap for the model's thinking, which Gemini 2.5 counts
+# against max_output_tokens. The pro tier always thinks and may spend
+# thousands of tokens before answering; the flash tier thinks little.
+_THINKING_HEADROOM = {
+    "pro": 8192,
+    "flash": 1024,
+}
+
+
+def _curriculum_max_tokens(number_of_weeks: int) -> int:
+    """Output token cap for a curriculum of the given length."""
+    return max(_MAX_OUTPUT_TOKENS["curriculum_min"], _MAX_OUTPUT_TOKENS["curriculum_week"] * number_of_weeks)
+
+
+def _questions_max_tokens(question_count: int) -> int:
+    """Output token cap for a pretest or quiz response with this many questions."""
+    return _MAX_OUTPUT_TOKENS["question"] * question_count
+
+
+def _format_topics(topics: Iterable[Topic]) -> str:
+    """Prompt lines for topics, one "- id: title - description" line each."""
+    return "\n".join(f"- {t.id}: {t.title} - {t.description}" for t in topics)
+
+
+def _format_resources(resources: List[Resource]) -> str:
+    """Prompt lines for a topic's resources, one per resource."""
+    return "\n".join(f"- [{resource.type}] {resource.url}" for resource in resources)
+
+
+def _curriculum_semantic_key(
+    content: str,
+    number_of_weeks: int,
+    include_study_materials: bool,
+    include_media_links: bool
+) -> Tuple[str, str]:
+    """Semantic cache key: structured options must match, the outline may be paraphrased."""
+    namespace = f"curriculum|{number_of_weeks}|{bool(include_study_materials)}|{bool(include_media_links)}"
+    return namespace, content
+
+
+def _lesson_notes_semantic_key(
+    topic_title: str,
+    topic_description: str,
+    topic_resources: List[Resource]
+) -> Tuple[str, str]:
+    """Semantic cache key: resources must match, the topic text may be paraphrased."""
+    namespace = "lesson|" + _format_resources(topic_resources)
+    return namespace, f"{topic_title}\n{topic_description}"
+
+
+def _create_model(model_name: str) -> genai.GenerativeModel:
+    """Create a Gemini model that answers in JSON, with a clear error if it is unavailable."""
+    try:
+        # Every prompt asks for JSON; requesting it as the response type
+        # keeps Gemini from wrapping it in markdown fences or prose.
+        # Per-call generation_config values are merged on top of this.
+        return genai.GenerativeModel(
+            model_name,
+            generation_config={"response_mime_type": "application/json"}
+        )
+    except NotFound as exc:
+        raise RuntimeError(
+            f"Gemini model '{model_name}' not found. Check your GEMINI_MODEL settings."
+        ) from exc
+    except Exception as exc:
+        raise RuntimeError(
+            f"Failed to initialize Gemini model '{model_name}': {exc}"
+        ) from exc
+
+
+def _truncated(response: Any) -> bool:
+    """True if Gemini stopped a response (or stream chunk) at the output token cap."""
+    return bool(response.candidates) and response.candidates[0].finish_reason.name == "MAX_TOKENS"
+
+
+def _response_text(response: Any, max_output_tokens: int, has_text: bool = False) -> str:
+    """
+    Text of a response, logging a warning when it was cut off at the cap.
+    
+    Args:
+        response: Response or stream chunk
+        max_output_tokens: Cap the call was made with
+        has_text: Earlier chunks of the same stream already produced text
+    
+    Raises:
+        RuntimeError: If the cap was used up before any text was produced
+    """
+    if not _truncated(response):
+        return response.text
+    logger.warning("Gemini response reached the %d output token cap and is incomplete", max_output_tokens)
+    try:
+        return response.text
+    except ValueError as exc:
+        if has_text:
+            return ""
+        raise RuntimeError(
+            f"Gemini used all {max_output_tokens} output tokens without producing a response"
+        ) from exc
 
 
 class GeminiClient:
     """Wrapper for Google Generative AI (Gemini) API."""
     
     def __init__(self):
-        """Initialize Gemini client with API key and configured model."""
+        """Initialize Gemini client with API key and configured models."""
         genai.configure(api_key=settings.google_api_key)
+        # Long-form generation (curriculum, lesson notes, quizzes) runs on the
+        # pro tier; short pretest and recommendation calls on the flash tier.
+        pro_name = settings.gemini_model_pro or settings.gemini_model
+        self.pro_model = _create_model(pro_name)
+        if settings.gemini_model_flash == pro_name:
+            self.flash_model = self.pro_model
+        else:
+            self.flash_model = _create_model(settings.gemini_model_flash)
+        self.response_cache = ResponseCache(
+            maxsize=settings.response_cache_size,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            path=_BACKEND_DIR / settings.response_cache_path if settings.response_cache_path else None
+        )
+        # Stay under Gemini's per-minute request and token quotas instead of
+        # running into 429s; input tokens are estimated as ~4 chars each.
+        self.request_limiter = TokenBucket(settings.gemini_requests_per_minute)
+        self.token_limiter = TokenBucket(settings.gemini_tokens_per_minute)
+        # Bound the calls in flight; interactive calls (HIGH) are admitted
+        # ahead of batch pretest generation (LOW), and callers are turned
+        # away with GeminiBusyError once too many are queued.
+        self.gate = PriorityGate(settings.gemini_max_in_flight, settings.gemini_max_queued)
+        # Near-duplicate inputs (paraphrased outlines, topic descriptions) can
+        # reuse a response when semantic caching is on. Cached calls then run
+        # at temperature 0 so a reused response is one the model would give.
+        self.semantic_cache: Optional[SemanticCache] = None
+        self.generation_config: Dict[str, Any] = {}
+        if settings.semantic_cache_enabled:
+            self.semantic_cache = SemanticCache(
+                maxsize=settings.response_cache_size,
+                threshold=settings.semantic_cache_threshold,
+                ttl_seconds=settings.response_cache_ttl_seconds,
+                path=_BACKEND_DIR / settings.response_cache_path if settings.response_cache_path else None
+            )
+            self.generation_config = {"temperature": 0}
+        # Retry transient errors with jittered exponential backoff (1s doubling
+        # up to 20s) until the deadline; 0 leaves the SDK's default.
+        self.request_options: Dict[str, Any] = {}
+        if settings.gemini_retry_timeout_seconds > 0:
+            backoff = dict(
+                predicate=_RETRYABLE,
+                initial=1.0,
+                maximum=20.0,
+                multiplier=2.0,
+                timeout=settings.gemini_retry_timeout_seconds
+            )
+            self.request_options = {"retry": retry_async.AsyncRetry(**backoff)}
+        # Response-cache key -> task generating it, shared by concurrent callers
+        self._inflight: Dict[str, "asyncio.Task[str]"] = {}
+    
+    async def aclose(self) -> None:
+        """
+        Close the SDK's shared gRPC channel; call once on application shutdown.
+        
+        Both model tiers reuse the SDK's process-wide async client, a single
+        HTTP/2 channel that multiplexes concurrent calls, so no per-call
+        connection setup happens and only this channel needs closing.
+        """
+        await genai_client.get_default_generative_async_client().transport.close()
+    
+    def _output_cap(self, model: genai.GenerativeModel, max_output_tokens: int) -> int:
+        """Token cap for a call to model: the response cap plus its tier's thinking headroom."""
+        return max_output_tokens + _THINKING_HEADROOM["pro" if model is self.pro_model else "flash"]
+    
+    def _config(self, max_output_tokens: int, response_schema: type) -> Dict[str, Any]:
+        """Generation config for one call: its response schema and output token cap."""
+        return {
+            **self.generation_config,
+            "max_output_tokens": max_output_tokens,
+            "response_schema": response_schema,
+        }
+    
+    async def _throttle_async(self, prompt: str) -> None:
+        """Wait for request and token quota before a Gemini call."""
+        await self.request_limiter.acquire_async()
+        await self.token_limiter.acquire_async(len(prompt) // 4)
+    
+    async def _embed_async(self, text: str) -> Optional[List[float]]:
+        """Embedding of a text for the semantic cache, or None if it is unavailable."""
         try:
-            self.model = genai.GenerativeModel(settings.gemini_model)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' not found. Check your GEMINI_MODEL setting."
-            ) from exc
+            return (await genai.embed_content_async(
+                model=settings.embedding_model,
+                content=text,
+                task_type="semantic_similarity"
+            ))["embedding"]
         except Exception as exc:
-            raise RuntimeError(
-                f"Failed to initialize Gemini model '{settings.gemini_model}': {exc}"
-            ) from exc
+            logger.warning("Embedding failed, skipping semantic cache: %s", exc)
+            return None
     
-    def generate_curriculum(
+    async def _generate_cached_async(
+        self,
+        prompt: str,
+        max_output_tokens: int,
+        response_schema: type,
+        semantic_key: Optional[Tuple[str, str]] = None,
+        model: Optional[genai.GenerativeModel] = None,
+        priority: int = HIGH
+    ) -> str:
+        """
+        Return Gemini's text for a prompt, reusing a cached response when an
+        identical prompt was answered recently.
+        
+        Concurrent calls with the same prompt share one Gemini request: the
+        first caller starts it and the others await the same task.
+        
+        Args:
+            prompt: Full prompt
+            max_output_tokens: Cap on the response length
+            response_schema: Schema of the JSON response (see utils.response_schemas)
+            semantic_key: Optional (namespace, free text) pair; with semantic
+                caching enabled, a response to a similar text in the same
+                namespace is reused as well
+            model: Model tier to call; the pro model by default
+            priority: HIGH for calls a user is waiting on, LOW for batch
+                work that may queue behind them
+        """
+        model = model or self.pro_model
+        key = ResponseCache.key(model.model_name, prompt)
+        cached = await asyncio.to_thread(self.response_cache.get, key)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._generate_uncached_async(
+                    key, prompt, max_output_tokens, response_schema, semantic_key, model, priority
+                )
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        # Shielded so one caller going away does not cancel the others' call
+        return await asyncio.shield(task)
+    
+    def _finish_inflight(self, key: str, task: "asyncio.Task[str]") -> None:
+        """Forget a finished shared call, marking its error as seen."""
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+    
+    async def _generate_uncached_async(
+        self,
+        key: str,
+        prompt: str,
+        max_output_tokens: int,
+        response_schema: type,
+        semantic_key: Optional[Tuple[str, str]],
+        model: genai.GenerativeModel,
+        priority: int
+    ) -> str:
+        """Cache-miss path of _generate_cached_async, run once per in-flight prompt."""
+        vector = None
+        if self.semantic_cache and semantic_key:
+            vector = await self._embed_async(semantic_key[1])
+            if vector:
+                # The similarity scan and SQLite sync run off the event loop
+                cached = await asyncio.to_thread(self.semantic_cache.get, semantic_key[0], vector)
+                if cached is not None:
+                    return cached
+        cap = self._output_cap(model, max_output_tokens)
+        async with self.gate.slot_async(priority):
+            await self._throttle_async(prompt)
+            try:
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config=self._config(cap, response_schema),
+                    request_options=self.request_options
+                )
+            except NotFound as exc:
+                raise RuntimeError(
+                    f"Gemini model '{model.model_name}' cannot generate content: {exc}"
+                ) from exc
+        text = _response_text(response, cap)
+        # An incomplete response is returned but never reused
+        if _truncated(response):
+            return text
+        await asyncio.to_thread(self.response_cache.set, key, text)
+        if vector:
+            await asyncio.to_thread(self.semantic_cache.add, semantic_key[0], vector, text)
+        return text
+    
+    async def _generate_stream(
+        self,
+        prompt: str,
+        max_output_tokens: int,
+        response_schema: type,
+        semantic_key: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of _generate_cached_async on the pro model.
+        
+        A cached response is yielded whole; otherwise Gemini's text is
+        yielded chunk by chunk and cached once the stream completes.
+        Closing the generator early stops reading the response.
+        """
+        key = ResponseCache.key(self.pro_model.model_name, prompt)
+        cached = await asyncio.to_thread(self.response_cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+        vector = None
+        if self.semantic_cache and semantic_key:
+            vector = await self._embed_async(semantic_key[1])
+            if vector:
+                # The similarity scan and SQLite sync run off the event loop
+                cached = await asyncio.to_thread(self.semantic_cache.get, semantic_key[0], vector)
+                if cached is not None:
+                    yield cached
+                    return
+        chunks = []
+        truncated = False
+        cap = self._output_cap(self.pro_model, max_output_tokens)
+        async with self.gate.slot_async(HIGH):
+            await self._throttle_async(prompt)
+            try:
+                response = await self.pro_model.generate_content_async(
+                    prompt,
+                    generation_config=self._config(cap, response_schema),
+                    stream=True,
+                    request_options=self.request_options
+                )
+                async for chunk in response:
+                    truncated = truncated or _truncated(chunk)
+                    text = _response_text(chunk, cap, has_text=bool(chunks))
+                    if text:
+                        chunks.append(text)
+                        yield text
+            except NotFound as exc:
+                raise RuntimeError(
+                    f"Gemini model '{self.pro_model.model_name}' cannot generate content: {exc}"
+                ) from exc
+        # An incomplete response is streamed but never reused
+        if truncated:
+            return
+        text = "".join(chunks)
+        await asyncio.to_thread(self.response_cache.set, key, text)
+        if vector:
+            await asyncio.to_thread(self.semantic_cache.add, semantic_key[0], vector, text)
+    
+    async def generate_curriculum_stream(
         self,
         content: str,
         number_of_weeks: int,
         include_study_materials: bool,
         include_media_links: bool
-    ) -> str:
+    ) -> AsyncIterator[str]:
         """
-        Call Gemini API to generate curriculum from rough outline.
+        Streaming variant of generate_curriculum_async.
         
-        Args:
-            content: User's rough syllabus or outline text
-            number_of_weeks: Number of weeks for the course
-            include_study_materials: Include study materials in response
-            include_media_links: Include media links in response
+        Yields the curriculum JSON text chunk by chunk as Gemini produces it,
+        so callers can forward progress before the whole generation is done.
+        Closing the generator early stops reading the response.
         
-        Returns:
-            Raw JSON string from Gemini
+        Yields:
+            Consecutive pieces of the raw JSON string from Gemini
         """
         prompt = self._build_prompt(
             content,
@@ -49,13 +607,45 @@ class GeminiClient:
             include_study_materials,
             include_media_links
         )
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        chunks = self._generate_stream(
+            prompt,
+            _curriculum_max_tokens(number_of_weeks),
+            CurriculumSchema,
+            _curriculum_semantic_key(
+                content, number_of_weeks, include_study_materials, include_media_links
+            )
+        )
+        # Closed explicitly so an early exit releases the Gemini slot at once
+        async with aclosing(chunks):
+            async for text in chunks:
+                yield text
+    
+    async def generate_curriculum_async(
+        self,
+        content: str,
+        number_of_weeks: int,
+        include_study_materials: bool,
+        include_media_links: bool
+    ) -> str:
+        """
+        Call Gemini API to generate curriculum from rough outline.
+        
+        The response is streamed internally and joined, so cancelling the
+        awaiting task (e.g. when the HTTP client disconnects) stops the
+        generation instead of waiting for the full response.
+        
+        Returns:
+            Raw JSON string from Gemini
+        """
+        chunks = [
+            chunk async for chunk in self.generate_curriculum_stream(
+                content,
+                number_of_weeks,
+                include_study_materials,
+                include_media_links
+            )
+        ]
+        return "".join(chunks)
     
     def _build_prompt(
         self,
@@ -76,63 +666,20 @@ class GeminiClient:
         Returns:
             Formatted prompt string
         """
-        resources_instruction = ""
-        if include_study_materials or include_media_links:
-            resources_instruction = "\nInclude relevant resources such as:"
-            if include_study_materials:
-                resources_instruction += "\n- Study materials (documentation, tutorials, books)"
-            if include_media_links:
-                resources_instruction += "\n- Media links (YouTube videos, online courses, podcasts)"
-        
-        prompt = f"""You are a curriculum design expert. Given a rough course outline, expand it into a comprehensive curriculum.
-
-Rough Outline:
-{content}
-
-Requirements:
-- Create a curriculum for exactly {number_of_weeks} weeks
-- Each week should have a clear title and 3-5 topics
-- Each topic should have: id (format: "topic_[week]_[number]"), title, and a detailed description
-{resources_instruction}
-- For each resource, specify the type: "article" (links to read), "video" (videos to watch), "pdf" (PDF documents), or "course" (online courses)
-- Return the response as valid JSON only (no markdown, no extra text)
-
-JSON Format:
-{{
-  "weeks": [
-    {{
-      "week_number": 1,
-      "title": "Week Title",
-      "topics": [
-        {{
-          "id": "topic_1_1",
-          "title": "Topic Title",
-          "description": "Detailed description",
-          "resources": [
-            {{
-              "url": "https://example.com/article",
-              "type": "article"
-            }},
-            {{
-              "url": "https://youtube.com/watch?v=example",
-              "type": "video"
-            }}
-          ]
-        }}
-      ]
-    }}
-  ]
-}}
-
-Generate the comprehensive curriculum now:"""
-        
-        return prompt
+        resources_instruction = _CURRICULUM_RESOURCES_INSTRUCTIONS[
+            (bool(include_study_materials), bool(include_media_links))
+        ]
+        return _CURRICULUM_PROMPT_PREFIX + _CURRICULUM_PROMPT_SUFFIX.format(
+            content=content,
+            number_of_weeks=number_of_weeks,
+            resources_instruction=resources_instruction
+        )
     
-    def generate_lesson_notes(
+    async def generate_lesson_notes_async(
         self,
         topic_title: str,
         topic_description: str,
-        topic_resources: List = None
+        topic_resources: Optional[List[Resource]] = None
     ) -> str:
         """
         Call Gemini API to generate detailed lesson notes for a topic.
@@ -150,19 +697,46 @@ Generate the comprehensive curriculum now:"""
             topic_description,
             topic_resources or []
         )
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        return await self._generate_cached_async(
+            prompt,
+            _MAX_OUTPUT_TOKENS["lesson_notes"],
+            LessonNotesSchema,
+            _lesson_notes_semantic_key(topic_title, topic_description, topic_resources or [])
+        )
+    
+    async def generate_lesson_notes_stream(
+        self,
+        topic_title: str,
+        topic_description: str,
+        topic_resources: Optional[List[Resource]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_lesson_notes_async.
+        
+        Yields:
+            Consecutive pieces of the raw JSON string from Gemini
+        """
+        prompt = self._build_lesson_notes_prompt(
+            topic_title,
+            topic_description,
+            topic_resources or []
+        )
+        chunks = self._generate_stream(
+            prompt,
+            _MAX_OUTPUT_TOKENS["lesson_notes"],
+            LessonNotesSchema,
+            _lesson_notes_semantic_key(topic_title, topic_description, topic_resources or [])
+        )
+        # Closed explicitly so an early exit releases the Gemini slot at once
+        async with aclosing(chunks):
+            async for text in chunks:
+                yield text
     
     def _build_lesson_notes_prompt(
         self,
         topic_title: str,
         topic_description: str,
-        topic_resources: List
+        topic_resources: List[Resource]
     ) -> str:
         """
         Build the prompt for generating lesson notes.
@@ -177,183 +751,59 @@ Generate the comprehensive curriculum now:"""
         """
         resources_context = ""
         if topic_resources:
-            resources_context = "\n\nAvailable Resources:"
-            for resource in topic_resources:
-                if hasattr(resource, 'url') and hasattr(resource, 'type'):
-                    resources_context += f"\n- [{resource.type}] {resource.url}"
-                elif isinstance(resource, dict):
-                    resources_context += f"\n- [{resource.get('type', 'link')}] {resource.get('url', '')}"
+            resources_context = "\n\nAvailable Resources:\n" + _format_resources(topic_resources)
         
-        prompt = f"""You are an expert educator creating detailed lesson notes for a topic. Generate comprehensive lesson notes that will help teachers deliver an effective lesson.
-
-Topic: {topic_title}
-
-Description: {topic_description}
-{resources_context}
-
-Create detailed lesson notes with the following structure:
-1. **Introduction** - Brief overview and learning objectives
-2. **Detailed Explanation** - Core concepts and key points explained thoroughly
-3. **Practical Examples** - 2-3 concrete examples demonstrating the concepts
-4. **Learning Activities** - 2-3 hands-on activities or exercises for student engagement
-5. **Summary** - Key takeaways and recap
-
-Requirements:
-- Make content clear, engaging, and appropriate for teaching
-- Include specific examples that illustrate the concepts
-- Provide activities that promote active learning and understanding
-- Estimate the total lesson duration
-- Return the response as valid JSON only (no markdown, no extra text)
-
-JSON Format:
-{{
-  "sections": [
-    {{
-      "section_type": "introduction",
-      "title": "Introduction",
-      "content": "Overview and learning objectives..."
-    }},
-    {{
-      "section_type": "explanation",
-      "title": "Core Concepts",
-      "content": "Detailed explanation of key concepts..."
-    }},
-    {{
-      "section_type": "example",
-      "title": "Example 1: [Specific Example Title]",
-      "content": "Concrete example demonstrating the concept..."
-    }},
-    {{
-      "section_type": "example",
-      "title": "Example 2: [Another Example Title]",
-      "content": "Another practical example..."
-    }},
-    {{
-      "section_type": "activity",
-      "title": "Activity 1: [Activity Name]",
-      "content": "Hands-on activity description with instructions..."
-    }},
-    {{
-      "section_type": "activity",
-      "title": "Activity 2: [Another Activity Name]",
-      "content": "Another engaging activity..."
-    }},
-    {{
-      "section_type": "summary",
-      "title": "Key Takeaways",
-      "content": "Summary of main points and learning outcomes..."
-    }}
-  ],
-  "estimated_duration": "45 minutes"
-}}
-
-Generate the detailed lesson notes now:"""
-        
-        return prompt
+        return _LESSON_NOTES_PROMPT_PREFIX + _LESSON_NOTES_PROMPT_SUFFIX.format(
+            topic_title=topic_title,
+            topic_description=topic_description,
+            resources_context=resources_context
+        )
     
-    def generate_pretest(
+    async def generate_prerequisite_questions_async(
         self,
-        curriculum_data: Dict[str, Any]
+        topics: List[Topic]
     ) -> str:
         """
-        Generate pretest questions based on curriculum topics.
+        Generate the prerequisite section of a pretest for a course's topics.
         
         Args:
-            curriculum_data: Dictionary containing curriculum weeks and topics
+            topics: Every curriculum topic
             
         Returns:
             Raw JSON string from Gemini with pretest questions
         """
-        prompt = self._build_pretest_prompt(curriculum_data)
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        prompt = _PREREQUISITE_QUESTIONS_PROMPT_PREFIX + _PREREQUISITE_QUESTIONS_PROMPT_SUFFIX.format(
+            topics_text=_format_topics(topics)
+        )
+        return await self._generate_cached_async(prompt, _questions_max_tokens(12), PretestSchema, model=self.flash_model, priority=LOW)
     
-    def _build_pretest_prompt(self, curriculum_data: Dict[str, Any]) -> str:
+    async def generate_topic_questions_async(
+        self,
+        topic: Topic,
+        question_count: int
+    ) -> str:
         """
-        Build prompt for pretest generation.
+        Generate pretest readiness questions for a single topic.
         
         Args:
-            curriculum_data: Curriculum data with weeks and topics
+            topic: Topic with id, title and description
+            question_count: Number of questions to ask for
             
         Returns:
-            Formatted prompt string
+            Raw JSON string from Gemini with pretest questions
         """
-        # Extract topics from curriculum
-        topics_list = []
-        first_week_topics = []
-        for week_idx, week in enumerate(curriculum_data.get("weeks", [])):
-            for topic in week.get("topics", []):
-                topic_data = {
-                    "id": topic.get("id", ""),
-                    "title": topic.get("title", ""),
-                    "description": topic.get("description", "")
-                }
-                topics_list.append(topic_data)
-                # Collect first week topics
-                if week_idx == 0:
-                    first_week_topics.append(topic_data)
-        
-        topics_text = "\n".join([
-            f"- {t['id']}: {t['title']} - {t['description']}"
-            for t in topics_list
-        ])
-        
-        first_week_text = "\n".join([
-            f"- {t['id']}: {t['title']} - {t['description']}"
-            for t in first_week_topics
-        ]) if first_week_topics else "None"
-
-        prompt = f"""You are an expert test creator. Generate a SHORT pretest to assess students' readiness for this course.
-
-Full Curriculum Topics (for reference):
-{topics_text}
-
-First Week Topics (students will learn these early):
-{first_week_text}
-
-CRITICAL REQUIREMENTS - READ CAREFULLY:
-- Generate multiple choice questions (aim for 5-15 questions)
-- MAXIMUM 15 QUESTIONS - DO NOT EXCEED THIS LIMIT
-- If you generate more than 15 questions, only the first 15 will be displayed and graded
-- Each question must have exactly 4 options (A, B, C, D)
-- Focus PRIMARILY on prerequisite knowledge students should have BEFORE starting this course
-- Include 2-3 questions from the first week's topics to gauge readiness for early lessons
-- Questions should assess foundational knowledge and prerequisite concepts needed for success
-- Mix easy, medium, and challenging questions
-- For each question, specify which topic it relates to (use the topic ID)
-- Return the response as valid JSON only (no markdown, no extra text)
-- DO NOT try to cover all topics - focus on prerequisites and early course readiness
-- IMPORTANT: This is a SHORT readiness assessment, NOT a comprehensive exam
-
-JSON Format:
-{{
-  "questions": [
-    {{
-      "id": "q1",
-      "question": "What is the primary purpose of React hooks?",
-      "options": [
-        "To manage component state and side effects",
-        "To style React components",
-        "To handle routing in React applications",
-        "To optimize React component rendering"
-      ],
-      "correctAnswer": 0,
-      "topicId": "topic_1_1",
-      "topicTitle": "Introduction to React"
-    }}
-  ]
-}}
-
-Generate the pretest questions now:"""
-        
-        return prompt
+        prompt = _TOPIC_QUESTIONS_PROMPT_PREFIX + _TOPIC_QUESTIONS_PROMPT_SUFFIX.format(
+            question_count=question_count,
+            topic_id=topic.id,
+            topic_title=topic.title,
+            topic_description=topic.description
+        )
+        return await self._generate_cached_async(
+            prompt, _questions_max_tokens(question_count), PretestSchema,
+            model=self.flash_model, priority=LOW
+        )
     
-    def generate_recommendation(
+    async def generate_recommendation_async(
         self,
         topic_id: str,
         topic_title: str,
@@ -375,13 +825,13 @@ Generate the pretest questions now:"""
         prompt = self._build_recommendation_prompt(
             topic_id, topic_title, topic_description, student_performance
         )
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        return await self._generate_cached_async(
+            prompt,
+            _MAX_OUTPUT_TOKENS["recommendation"],
+            RecommendationSchema,
+            (f"recommendation|{topic_id}|{topic_title}", f"{topic_description}\n{student_performance}"),
+            model=self.flash_model
+        )
     
     def _build_recommendation_prompt(
         self,
@@ -402,38 +852,44 @@ Generate the pretest questions now:"""
         Returns:
             Formatted prompt string
         """
-        prompt = f"""You are an educational advisor. A student needs help with a specific topic they struggled with on a pretest.
-
-Topic: {topic_title}
-Description: {topic_description}
-Student Performance: {student_performance}
-
-Generate ONE targeted learning resource recommendation:
-- Provide a specific, high-quality online resource (article, video, course, or PDF)
-- The resource should be appropriate for someone learning this topic from scratch or needing reinforcement
-- Include a brief explanation of why this resource will help
-- Return the response as valid JSON only (no markdown, no extra text)
-
-JSON Format:
-{{
-  "topicId": "{topic_id}",
-  "topicTitle": "{topic_title}",
-  "recommendation": "Brief explanation of why this topic needs attention and how the resource helps",
-  "resourceUrl": "https://example.com/resource",
-  "resourceType": "article"
-}}
-
-Resource types: "article" (articles, tutorials, documentation), "video" (YouTube, educational videos), "course" (online courses like Coursera, Khan Academy), or "pdf" (PDF documents)
-
-Generate the recommendation now:"""
+        return _RECOMMENDATION_PROMPT_PREFIX + _RECOMMENDATION_PROMPT_SUFFIX.format(
+            topic_id=topic_id,
+            topic_title=topic_title,
+            topic_description=topic_description,
+            student_performance=student_performance
+        )
+    
+    async def _generate_quiz_async(self, prompt: str, priority: int = HIGH) -> str:
+        """
+        Return Gemini's quiz JSON for a prompt.
         
-        return prompt
+        Quizzes skip the response cache and its temperature override: each
+        request should get a fresh set of questions. Pre-generation passes
+        LOW priority so requests a student is waiting on go first.
+        """
+        cap = self._output_cap(self.pro_model, _questions_max_tokens(10))
+        async with self.gate.slot_async(priority):
+            await self._throttle_async(prompt)
+            try:
+                response = await self.pro_model.generate_content_async(
+                    prompt, generation_config={
+                        "max_output_tokens": cap,
+                        "response_schema": QuizSchema,
+                    },
+                    request_options=self.request_options
+                )
+            except NotFound as exc:
+                raise RuntimeError(
+                    f"Gemini model '{self.pro_model.model_name}' cannot generate content: {exc}"
+                ) from exc
+        return _response_text(response, cap)
     
-    def generate_main_quiz(
+    async def generate_main_quiz_async(
         self,
         week_number: int,
-        current_week_topics: List[Dict[str, Any]],
-        previous_week_topics: Optional[List[Dict[str, Any]]] = None
+        current_week_topics: List[Topic],
+        previous_week_topics: Optional[List[Topic]] = None,
+        priority: int = HIGH
     ) -> str:
         """
         Generate main quiz questions for a week.
@@ -442,88 +898,38 @@ Generate the recommendation now:"""
             week_number: Week number
             current_week_topics: List of topics for the current week
             previous_week_topics: Optional list of topics from previous week (for bonus questions)
+            priority: HIGH when a student is waiting, LOW for pre-generation
             
         Returns:
             Raw JSON string from Gemini with quiz questions
         """
         prompt = self._build_main_quiz_prompt(week_number, current_week_topics, previous_week_topics)
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        return await self._generate_quiz_async(prompt, priority)
     
     def _build_main_quiz_prompt(
         self,
         week_number: int,
-        current_week_topics: List[Dict[str, Any]],
-        previous_week_topics: Optional[List[Dict[str, Any]]] = None
+        current_week_topics: List[Topic],
+        previous_week_topics: Optional[List[Topic]] = None
     ) -> str:
         """Build prompt for main quiz generation."""
-        current_topics_text = "\n".join([
-            f"- {t.get('id', '')}: {t.get('title', '')} - {t.get('description', '')}"
-            for t in current_week_topics
-        ])
-        
         bonus_instruction = ""
         if previous_week_topics:
-            previous_topics_text = "\n".join([
-                f"- {t.get('id', '')}: {t.get('title', '')} - {t.get('description', '')}"
-                for t in previous_week_topics
-            ])
-            bonus_instruction = f"""
-- Include 1-2 bonus questions from the previous week's topics (these should be marked with isBonus: true)
-Previous Week Topics:
-{previous_topics_text}"""
-        
-        prompt = f"""You are an expert quiz creator. Generate a main quiz for Week {week_number} of a course.
-
-Current Week Topics:
-{current_topics_text}
-{bonus_instruction}
-
-Requirements:
-- Generate exactly 8 questions on the current week's topics
-- Maximum 10 questions total (8 current week + 1-2 bonus from previous week)
-- Each question must have exactly 4 multiple choice options
-- Questions should test understanding of what students have learned this week
-- Mix of difficulty levels (easy, medium, hard)
-- For each question, specify the topicId it relates to
-- Bonus questions should be marked with isBonus: true
-- Return the response as valid JSON only (no markdown, no extra text)
-
-JSON Format:
-{{
-  "questions": [
-    {{
-      "id": "q1",
-      "question": "What is the primary purpose of React hooks?",
-      "options": [
-        "To manage component state and side effects",
-        "To style React components",
-        "To handle routing in React applications",
-        "To optimize React component rendering"
-      ],
-      "correctAnswer": 0,
-      "topicId": "topic_1_1",
-      "topicTitle": "Introduction to React",
-      "conceptId": "hooks_basics",
-      "difficultyLevel": "medium",
-      "isBonus": false
-    }}
-  ]
-}}
-
-Generate the main quiz questions now:"""
-        
-        return prompt
+            bonus_instruction = _MAIN_QUIZ_BONUS_INSTRUCTION.format(
+                previous_topics_text=_format_topics(previous_week_topics)
+            )
+        
+        return _MAIN_QUIZ_PROMPT_PREFIX + _MAIN_QUIZ_PROMPT_SUFFIX.format(
+            week_number=week_number,
+            current_topics_text=_format_topics(current_week_topics),
+            bonus_instruction=bonus_instruction
+        )
     
-    def generate_refresher_quiz(
+    async def generate_refresher_quiz_async(
         self,
         week_number: int,
-        topics: List[Dict[str, Any]]
+        topics: List[Topic],
+        priority: int = HIGH
     ) -> str:
         """
         Generate refresher quiz questions for a week.
@@ -532,75 +938,29 @@ Generate the main quiz questions now:"""
         Args:
             week_number: Week number
             topics: List of topics for the week
+            priority: HIGH when a student is waiting, LOW for pre-generation
             
         Returns:
             Raw JSON string from Gemini with quiz questions
         """
         prompt = self._build_refresher_quiz_prompt(week_number, topics)
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        return await self._generate_quiz_async(prompt, priority)
     
     def _build_refresher_quiz_prompt(
         self,
         week_number: int,
-        topics: List[Dict[str, Any]]
+        topics: List[Topic]
     ) -> str:
         """Build prompt for refresher quiz generation."""
-        topics_text = "\n".join([
-            f"- {t.get('id', '')}: {t.get('title', '')} - {t.get('description', '')}"
-            for t in topics
-        ])
-        
-        prompt = f"""You are an expert quiz creator. Generate a refresher quiz for Week {week_number} of a course.
-
-Week Topics:
-{topics_text}
-
-Requirements:
-- Generate exactly 10 questions solely on this week's topics
-- Each question must have exactly 4 multiple choice options
-- Questions should test understanding of the week's concepts but from different angles than previous quizzes
-- Vary the question types and approaches while covering the same concepts
-- Mix of difficulty levels (easy, medium, hard)
-- For each question, specify the topicId it relates to
-- No bonus questions (isBonus should always be false)
-- Return the response as valid JSON only (no markdown, no extra text)
-
-JSON Format:
-{{
-  "questions": [
-    {{
-      "id": "q1",
-      "question": "Which React hook is used to manage component state?",
-      "options": [
-        "useState",
-        "useEffect",
-        "useContext",
-        "useReducer"
-      ],
-      "correctAnswer": 0,
-      "topicId": "topic_1_1",
-      "topicTitle": "React Hooks",
-      "conceptId": "state_management",
-      "difficultyLevel": "easy",
-      "isBonus": false
-    }}
-  ]
-}}
-
-Generate fresh refresher quiz questions now (different from any previous quizzes but covering the same concepts):"""
-        
-        return prompt
+        return _REFRESHER_QUIZ_PROMPT_PREFIX + _REFRESHER_QUIZ_PROMPT_SUFFIX.format(
+            week_number=week_number,
+            topics_text=_format_topics(topics)
+        )
     
-    def generate_dynamic_quiz(
+    async def generate_dynamic_quiz_async(
         self,
         week_number: int,
-        topics: List[Dict[str, Any]],
+        topics: List[Topic],
         student_weaknesses: List[str]
     ) -> str:
         """
@@ -615,72 +975,37 @@ Generate fresh refresher quiz questions now (different from any previous quizzes
             Raw JSON string from Gemini with quiz questions
         """
         prompt = self._build_dynamic_quiz_prompt(week_number, topics, student_weaknesses)
-        try:
-            response = self.model.generate_content(prompt)
-        except NotFound as exc:
-            raise RuntimeError(
-                f"Gemini model '{settings.gemini_model}' cannot generate content: {exc}"
-            ) from exc
-        return response.text
+        return await self._generate_quiz_async(prompt)
     
     def _build_dynamic_quiz_prompt(
         self,
         week_number: int,
-        topics: List[Dict[str, Any]],
+        topics: List[Topic],
         student_weaknesses: List[str]
     ) -> str:
         """Build prompt for dynamic quiz generation."""
-        topics_text = "\n".join([
-            f"- {t.get('id', '')}: {t.get('title', '')} - {t.get('description', '')}"
-            for t in topics
-        ])
-        
         weaknesses_text = ", ".join(student_weaknesses) if student_weaknesses else "None identified yet"
         
         # Adjust prompt based on whether weaknesses exist
         if student_weaknesses:
-            focus_instruction = f"- Focus on topics where the student struggled (topic IDs: {weaknesses_text})\n- Questions should address common misconceptions and reinforce understanding"
+            focus_instruction = _DYNAMIC_QUIZ_WEAKNESS_FOCUS.format(weaknesses_text=weaknesses_text)
         else:
-            focus_instruction = "- Focus on all topics from this week to provide comprehensive practice\n- Questions should cover foundational concepts and common areas where students typically struggle"
+            focus_instruction = _DYNAMIC_QUIZ_GENERAL_FOCUS
         
-        prompt = f"""You are an expert quiz creator. Generate a dynamic quiz for Week {week_number} to help a student improve.
-
-Week Topics:
-{topics_text}
+        return _DYNAMIC_QUIZ_PROMPT_PREFIX + _DYNAMIC_QUIZ_PROMPT_SUFFIX.format(
+            week_number=week_number,
+            topics_text=_format_topics(topics),
+            weaknesses_text=weaknesses_text,
+            focus_instruction=focus_instruction
+        )
 
-Student's Weak Areas (Topic IDs): {weaknesses_text}
 
-Requirements:
-- Generate exactly 10 questions from this week's topics
-{focus_instruction}
-- Adaptive difficulty - start with foundational concepts, then build up
-- Each question must have exactly 4 multiple choice options
-- For each question, specify the topicId it relates to
-- Questions should help identify and correct misunderstandings
-- Return the response as valid JSON only (no markdown, no extra text)
-
-JSON Format:
-{{
-  "questions": [
-    {{
-      "id": "q1",
-      "question": "Which of the following correctly demonstrates useState hook usage?",
-      "options": [
-        "const [count] = useState(0);",
-        "const [count, setCount] = useState(0);",
-        "const count = useState(0);",
-        "const {{count}} = useState(0);"
-      ],
-      "correctAnswer": 1,
-      "topicId": "topic_1_1",
-      "topicTitle": "React Hooks",
-      "conceptId": "useState_syntax",
-      "difficultyLevel": "medium",
-      "isBonus": false
-    }}
-  ]
-}}
+@lru_cache(maxsize=1)
+def get_gemini_client() -> GeminiClient:
+    """
+    Return the process-wide GeminiClient.
 
-Generate the dynamic quiz questions targeting the student's weak areas:"""
-        
-        return prompt
\ No newline at end of file
+    Services share one client so the SDK is configured and the model handle
+    (and its connection pool) is created once rather than per service.
+    """
+    return GeminiClient()
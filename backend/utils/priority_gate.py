@@ -0,0 +1,134 @@
+"""
+Priority admission with backpressure for outbound API calls.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator, List, Tuple
+
+
+# Priorities: lower values are admitted first
+HIGH = 0
+LOW = 1
+
+
+class GeminiBusyError(RuntimeError):
+    """Raised when too many Gemini calls are already waiting for a slot."""
+
+
+class _Waiter:
+    """A caller queued for a slot."""
+
+    __slots__ = ("notify", "admitted")
+    
+    def __init__(self, notify: Callable[[], None]):
+        self.notify = notify
+        self.admitted = False
+
+
+class PriorityGate:
+    """
+    Thread-safe cap on concurrent calls that admits waiters by priority.
+    
+    When every slot is busy, callers wait in a bounded queue ordered by
+    priority (then arrival), so interactive requests overtake queued batch
+    work. Once the queue is full, new callers are rejected with
+    GeminiBusyError instead of piling up. Works the same from threads and
+    from any event loop.
+    """
+    
+    def __init__(self, slots: int, max_waiting: int):
+        """
+        Initialize the gate.
+        
+        Args:
+            slots: Calls allowed in flight at once; 0 disables the gate
+            max_waiting: Callers allowed to queue for a slot before new ones
+                are rejected
+        """
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self._in_use = 0
+        self._waiters: List[Tuple[int, int, _Waiter]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+    
+    def _enqueue(self, priority: int, waiter: _Waiter) -> bool:
+        """Take a free slot (True) or queue ``waiter`` for one (False)."""
+        with self._lock:
+            if self._in_use < self.slots and not self._waiters:
+                self._in_use += 1
+                return True
+            if len(self._waiters) >= self.max_waiting:
+                raise GeminiBusyError("Too many AI requests are queued; please retry shortly")
+            heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+            return False
+    
+    def _release(self) -> None:
+        """Hand the slot to the next queued waiter, or free it."""
+        with self._lock:
+            if self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                waiter.admitted = True
+                waiter.notify()
+                return
+            self._in_use -= 1
+    
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Remove a waiter whose caller went away from the queue.
+        
+        Returns:
+            True if the waiter had already been handed a slot, which the
+            caller must then release
+        """
+        with self._lock:
+            if waiter.admitted:
+                return True
+            # Dropped at once so it neither counts toward max_waiting nor
+            # keeps later callers from taking a free slot
+            self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+            heapq.heapify(self._waiters)
+            return False
+    
+    @contextmanager
+    def slot(self, priority: int = HIGH) -> Iterator[None]:
+        """Hold a slot for the duration of the block, blocking the thread until one is free."""
+        if self.slots <= 0:
+            yield
+            return
+        admitted = threading.Event()
+        if not self._enqueue(priority, _Waiter(admitted.set)):
+            admitted.wait()
+        try:
+            yield
+        finally:
+            self._release()
+    
+    @asynccontextmanager
+    async def slot_async(self, priority: int = HIGH) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block, waiting without blocking the event loop."""
+        if self.slots <= 0:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+        
+        def notify() -> None:
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+        
+        waiter = _Waiter(notify)
+        if not self._enqueue(priority, waiter):
+            try:
+                await admitted
+            except asyncio.CancelledError:
+                # A slot handed over just as the caller went away is passed on
+                if self._abandon(waiter):
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
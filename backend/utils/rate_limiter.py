@@ -0,0 +1,56 @@
+"""
+Token-bucket rate limiting for outbound API calls.
+"""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at ``capacity`` per ``period``.
+
+    Callers reserve tokens up front; when the bucket is short the reservation
+    still succeeds but the caller waits until the deficit has refilled. This
+    keeps the order of callers fair and works the same from threads and from
+    any event loop.
+    """
+    
+    def __init__(self, capacity: float, period: float = 60.0):
+        """
+        Initialize the bucket (full).
+        
+        Args:
+            capacity: Tokens available per period; 0 disables limiting
+            period: Refill period in seconds
+        """
+        self.capacity = capacity
+        self.rate = capacity / period if capacity > 0 else 0
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens and return how long the caller must wait."""
+        if self.capacity <= 0:
+            return 0.0
+        # A single oversized request may use the whole bucket but no more
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+    
+    def acquire(self, amount: float = 1) -> None:
+        """Block the current thread until ``amount`` tokens are available."""
+        wait = self._reserve(amount)
+        if wait:
+            time.sleep(wait)
+    
+    async def acquire_async(self, amount: float = 1) -> None:
+        """Wait without blocking the event loop until ``amount`` tokens are available."""
+        wait = self._reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
@@ -0,0 +1,116 @@
+"""
+In-memory cache for Gemini responses keyed by prompt hash, optionally
+backed by a SQLite file shared across workers and restarts.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+# Expired rows are purged from the disk cache once every this many writes
+_PURGE_EVERY = 100
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of response text with a per-entry time-to-live."""
+    
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        ttl_seconds: float = 3600,
+        path: Optional[Path] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of responses kept in memory (least
+                recently used are evicted)
+            ttl_seconds: Seconds a response stays valid; 0 disables caching
+            path: SQLite file that also stores responses, so they survive
+                restarts and are shared by every worker process; memory
+                only if None
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        if path is not None and self.enabled:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, text TEXT NOT NULL)"
+            )
+    
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl_seconds > 0
+    
+    @staticmethod
+    def key(model_name: str, prompt: str) -> str:
+        """Cache key for a prompt sent to a given model."""
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if missing or expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return text
+                del self._entries[key]
+            if self._db is None:
+                return None
+            # Disk entries carry wall-clock expiry so other processes agree on it
+            now = time.time()
+            row = self._db.execute(
+                "SELECT expires_at, text FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._remember(key, time.monotonic() + (row[0] - now), row[1])
+            return row[1]
+    
+    def set(self, key: str, text: str) -> None:
+        """Store a response, evicting the least recently used entry if full."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, time.monotonic() + self.ttl_seconds, text)
+            if self._db is None:
+                return
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, text) VALUES (?, ?, ?)",
+                (key, now + self.ttl_seconds, text)
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+    
+    def _remember(self, key: str, expires_at: float, text: str) -> None:
+        """Put an entry in the in-memory LRU; the lock must be held."""
+        self._entries[key] = (expires_at, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
@@ -0,0 +1,79 @@
+"""
+Response schemas passed to Gemini as ``response_schema``.
+
+They describe the JSON each prompt expects, so the prompts themselves no
+longer need to spell out an example document. Field names match what the
+services read from the parsed responses.
+"""
+from typing import Annotated, List, NotRequired
+
+from pydantic import Field
+from typing_extensions import TypedDict
+
+
+class CurriculumResource(TypedDict):
+    url: str
+    type: Annotated[str, Field(description="One of: article, video, pdf, course")]
+
+
+class CurriculumTopic(TypedDict):
+    id: Annotated[str, Field(description="Format: topic_[week]_[number]")]
+    title: str
+    description: Annotated[str, Field(description="Detailed description of the topic")]
+    resources: NotRequired[List[CurriculumResource]]
+
+
+class CurriculumWeek(TypedDict):
+    week_number: int
+    title: str
+    topics: List[CurriculumTopic]
+
+
+class CurriculumSchema(TypedDict):
+    weeks: List[CurriculumWeek]
+
+
+class LessonSection(TypedDict):
+    section_type: Annotated[
+        str, Field(description="One of: introduction, explanation, example, activity, summary")
+    ]
+    title: str
+    content: str
+
+
+class LessonNotesSchema(TypedDict):
+    sections: List[LessonSection]
+    estimated_duration: Annotated[str, Field(description="Total lesson duration, e.g. 45 minutes")]
+
+
+class PretestQuestion(TypedDict):
+    id: Annotated[str, Field(description="Format: q[number]")]
+    question: str
+    options: Annotated[List[str], Field(description="Exactly 4 answer options")]
+    correctAnswer: Annotated[int, Field(description="0-based index of the correct option")]
+    topicId: str
+    topicTitle: str
+
+
+class PretestSchema(TypedDict):
+    questions: List[PretestQuestion]
+
+
+class RecommendationSchema(TypedDict):
+    topicId: str
+    topicTitle: str
+    recommendation: Annotated[
+        str, Field(description="Why this topic needs attention and how the resource helps")
+    ]
+    resourceUrl: str
+    resourceType: Annotated[str, Field(description="One of: article, video, course, pdf")]
+
+
+class QuizQuestion(PretestQuestion):
+    conceptId: Annotated[str, Field(description="Short snake_case name of the concept tested")]
+    difficultyLevel: Annotated[str, Field(description="One of: easy, medium, hard")]
+    isBonus: bool
+
+
+class QuizSchema(TypedDict):
+    questions: List[QuizQuestion]
@@ -0,0 +1,129 @@
+"""
+Embedding-based cache for Gemini responses to near-duplicate inputs,
+optionally backed by a SQLite file shared across workers and restarts.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Optional, Sequence, Tuple
+
+import orjson
+
+
+# Expired rows are purged from the disk cache once every this many writes
+_PURGE_EVERY = 100
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """
+    Thread-safe store of (embedding, response) pairs searched by cosine similarity.
+
+    Entries are grouped by a namespace that must match exactly (e.g. the
+    prompt kind plus any structured parameters), so only the free-text part
+    of a request is compared semantically. Entries expire after
+    ``ttl_seconds`` and the oldest are evicted once ``maxsize`` is reached.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        threshold: float = 0.97,
+        ttl_seconds: float = 3600,
+        path: Optional[Path] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of responses kept across all namespaces
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Seconds a response stays valid; 0 disables caching
+            path: SQLite file that also stores entries, so they survive
+                restarts and are shared by every worker process; memory
+                only if None
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._entries: Deque[Tuple[float, str, List[float], str]] = deque()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_id = 0
+        self._writes = 0
+        if path is not None and self.enabled:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_responses (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "namespace TEXT NOT NULL, expires_at REAL NOT NULL, vector BLOB NOT NULL, text TEXT NOT NULL)"
+            )
+    
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl_seconds > 0
+    
+    def get(self, namespace: str, vector: Sequence[float]) -> Optional[str]:
+        """Return the response of the most similar entry above the threshold, if any."""
+        if not self.enabled:
+            return None
+        query = _normalize(vector)
+        best_score, best_text = self.threshold, None
+        now = time.time()
+        with self._lock:
+            self._sync(now)
+            entries = list(self._entries)
+        for expires_at, entry_namespace, entry_vector, text in entries:
+            if entry_namespace != namespace or len(entry_vector) != len(query) or expires_at <= now:
+                continue
+            score = sum(a * b for a, b in zip(query, entry_vector))
+            if score >= best_score:
+                best_score, best_text = score, text
+        return best_text
+    
+    def add(self, namespace: str, vector: Sequence[float], text: str) -> None:
+        """Store a response under its input embedding."""
+        if not self.enabled:
+            return
+        now = time.time()
+        normalized = _normalize(vector)
+        with self._lock:
+            if self._db is None:
+                self._append(now + self.ttl_seconds, namespace, normalized, text)
+                return
+            # The row comes back through _sync, in order with other workers' rows
+            self._db.execute(
+                "INSERT INTO semantic_responses (namespace, expires_at, vector, text) VALUES (?, ?, ?, ?)",
+                (namespace, now + self.ttl_seconds, orjson.dumps(normalized), text)
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM semantic_responses WHERE expires_at <= ?", (now,))
+            self._sync(now)
+    
+    def _sync(self, now: float) -> None:
+        """Load entries other processes wrote since the last sync; the lock must be held."""
+        if self._db is None:
+            return
+        rows = self._db.execute(
+            "SELECT id, namespace, expires_at, vector, text FROM semantic_responses "
+            "WHERE id > ? AND expires_at > ? ORDER BY id",
+            (self._last_id, now)
+        ).fetchall()
+        for row_id, namespace, expires_at, vector, text in rows:
+            self._append(expires_at, namespace, orjson.loads(vector), text)
+            self._last_id = row_id
+    
+    def _append(self, expires_at: float, namespace: str, vector: List[float], text: str) -> None:
+        """Add an entry, evicting the oldest if full; the lock must be held."""
+        self._entries.append((expires_at, namespace, vector, text))
+        while len(self._entries) > self.maxsize:
+            self._entries.popleft()